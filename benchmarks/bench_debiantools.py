@@ -0,0 +1,463 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Offline benchmark of the debiantools fetch/extract pipeline.
+
+Builds synthetic .deb files sized like the packages used by the recipes, serves them from local
+HTTP servers standing in for the Ubuntu/Debian mirrors and times fetching them through the public
+download_extract_debs() (download_extract_deb() of trees that predate it), as well as the failover
+from an unreachable to the fastest of several mirrors with injected latency.
+The ar parsing, decompression and extraction phases are read from the traced fetch records, trees that
+don't record them only report the end to end phases.
+Results are written as JSON, so the debiantools.py of different commits can be compared:
+
+    git worktree add /tmp/baseline <other commit>
+    python benchmarks/bench_debiantools.py --tree /tmp/baseline --output before.json
+    python benchmarks/bench_debiantools.py --output after.json --compare before.json
+"""
+
+import argparse
+import functools
+import hashlib
+import importlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+# the module under test, imported from --tree in main()
+debiantools = None
+
+TRIPLET = "x86_64-linux-gnu"
+
+# (count, size) of the files in each fixture, loosely modelled after the real packages
+FIXTURES = {
+    # libuuid1 + uuid-dev
+    "small": {"libraries": (1, 30_000), "headers": (2, 6_000), "docs": (10, 2_000)},
+    # libsystemd0 + libsystemd-dev, man pages make up most of the file count
+    "libsystemd": {"libraries": (1, 700_000), "headers": (40, 8_000), "docs": (300, 3_000)},
+    # libglib2.0-dev, hundreds of headers plus static archives and tooling
+    "glib-dev": {"libraries": (5, 1_000_000), "headers": (450, 10_000), "docs": (200, 4_000)},
+}
+
+WORDS = ("static inline gboolean const gchar void struct define include return guint32 "
+         "gpointer if else for while typedef enum union sizeof NULL TRUE FALSE").split()
+
+
+class _Output:
+    # no progress bars in Conan 1's download()
+    is_terminal = False
+
+    def info(self, msg):
+        pass
+
+    warning = highlight = success = error = info
+    # Conan 1
+    warn = write = writeln = rewrite_line = info
+
+
+class _Conf(dict):
+    def get(self, name, default=None, check_type=None):
+        return dict.get(self, name, default)
+
+    def __missing__(self, name):
+        # Conan 1 indexes the conf
+        return None
+
+
+class _Helpers:
+    # what conan's download() uses, which older trees fetch packages with
+    def __init__(self):
+        self.requester = requests.Session()
+        self.global_conf = _Conf()
+        self.cache = None
+
+
+class BenchConanfile:
+    """
+    The parts of a ConanFile that debiantools uses.
+    """
+
+    display_name = "bench"
+
+    def __init__(self, build_folder, **conf):
+        self.build_folder = build_folder
+        self.output = _Output()
+        self.conf = _Conf(conf)
+        self._conan_helpers = _Helpers()
+        # Conan 1
+        self._conan_requester = self._conan_helpers.requester
+
+    def run(self, command):
+        subprocess.run(command, shell=True, check=True, stdout=subprocess.DEVNULL)
+
+
+def _text(rnd, size):
+    out = []
+    length = 0
+    while length < size:
+        word = rnd.choice(WORDS)
+        out.append(word)
+        length += len(word) + 1
+    return " ".join(out).encode()[:size]
+
+
+def _binary(rnd, size):
+    # machine code compresses to roughly a third, mix random bytes with repeated ones
+    chunks = []
+    while sum(len(c) for c in chunks) < size:
+        chunks.append(rnd.randbytes(256))
+        chunks.append(bytes([rnd.randrange(256)]) * 512)
+    return b"".join(chunks)[:size]
+
+
+def _add(tar, name, data=None, linkname=None):
+    info = tarfile.TarInfo("./" + name)
+    info.mtime = 1_600_000_000
+    if linkname is not None:
+        info.type = tarfile.SYMTYPE
+        info.linkname = linkname
+        tar.addfile(info)
+    else:
+        info.size = len(data)
+        info.mode = 0o644
+        tar.addfile(info, io.BytesIO(data))
+
+
+def _tar(files, compression):
+    raw = io.BytesIO()
+    with tarfile.open(fileobj=raw, mode="w") as tar:
+        for name, data, linkname in files:
+            _add(tar, name, data, linkname)
+    data = raw.getvalue()
+    if compression == "xz":
+        import lzma
+        return lzma.compress(data, preset=6)
+    if compression == "gz":
+        import gzip
+        return gzip.compress(data, 6)
+    if compression == "zst":
+        return subprocess.run(["zstd", "-19", "-c"], input=data, stdout=subprocess.PIPE, check=True).stdout
+    return data
+
+
+def _ar(members):
+    out = [b"!<arch>\n"]
+    for name, data in members:
+        header = f"{name:<16}{1600000000:<12}{0:<6}{0:<6}{100644:<8}{len(data):<10}`\n"
+        out.append(header.encode("ascii"))
+        out.append(data)
+        if len(data) % 2:
+            out.append(b"\n")
+    return b"".join(out)
+
+
+def build_deb(name, layout, compression, seed=0):
+    """
+    Returns the bytes of a synthetic .deb following the layout of the Debian library packages.
+    """
+    rnd = random.Random(f"{name}-{seed}")
+    files = []
+    count, size = layout["libraries"]
+    for i in range(count):
+        lib = f"usr/lib/{TRIPLET}/lib{name}{i}.so"
+        files.append((f"{lib}.0.1.0", _binary(rnd, size), None))
+        files.append((f"{lib}.0", None, f"lib{name}{i}.so.0.1.0"))
+        files.append((lib, None, f"/{lib}.0.1.0"))
+    count, size = layout["headers"]
+    for i in range(count):
+        files.append((f"usr/include/{name}/header{i}.h", _text(rnd, size), None))
+    count, size = layout["docs"]
+    for i in range(count):
+        files.append((f"usr/share/man/man3/{name}{i}.3.gz", _text(rnd, size), None))
+    files.append((f"usr/share/doc/{name}/copyright", _text(rnd, 1500), None))
+
+    control = _tar([("control", f"Package: {name}\nVersion: 1.0-1\nArchitecture: amd64\n".encode(), None)], "xz")
+    data_name = f"data.tar.{compression}" if compression else "data.tar"
+    return _ar([("debian-binary", b"2.0\n"),
+                ("control.tar.xz", control),
+                (data_name, _tar(files, compression))])
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    latency = 0.0
+
+    def parse_request(self):
+        time.sleep(self.latency)
+        return super().parse_request()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MirrorServer:
+    """
+    Local HTTP server standing in for a Debian mirror, serving the files in folder.
+    Every request is delayed by latency seconds.
+    """
+
+    def __init__(self, folder, latency=0.0):
+        handler_class = type("_Handler", (_QuietHandler,), {"latency": latency})
+        handler = functools.partial(handler_class, directory=folder)
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _timed(function, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def _phase(seconds, size):
+    return {"seconds": round(seconds, 6), "bytes": size,
+            "mb_per_s": round(size / seconds / 1e6, 2) if seconds > 0 else None}
+
+
+def fetch_debs(conanfile, debs):
+    """
+    Extracts the packages into the build folder of conanfile through the public api of the tree under test.
+    """
+    if hasattr(debiantools, "download_extract_debs"):
+        debiantools.download_extract_debs(conanfile, debs)
+        return
+    # one package at a time, into the current folder
+    cwd = os.getcwd()
+    os.chdir(conanfile.build_folder)
+    try:
+        for url, sha256 in debs:
+            debiantools.download_extract_deb(conanfile, url, sha256)
+    finally:
+        os.chdir(cwd)
+
+
+def _files(folder):
+    # without the record of the extracted files that newer trees write
+    manifest = getattr(debiantools, "MANIFEST_FILE", None)
+    return sum(len([name for name in f if name != manifest]) for _, _, f in os.walk(folder))
+
+
+def _stage_phases(trace_file, deb_size):
+    """
+    The ar parsing, decompression and extraction phases, from the medians of the stage timings in the fetch records
+    that the tree under test traced. Empty for trees that don't time the stages of a fetch.
+    """
+    records = []
+    if os.path.exists(trace_file):
+        with open(trace_file) as f:
+            records = [r for r in map(json.loads, f)
+                       if r["phase"] == "fetch" and r.get("cache") == "miss" and "ar_seconds" in r]
+    if not records:
+        return {}
+    extracted = records[-1]["extracted_bytes"]
+    return {"ar_parse": _phase(statistics.median(r["ar_seconds"] for r in records), deb_size),
+            "decompress": _phase(statistics.median(r["decompress_seconds"] for r in records), extracted),
+            "extract": _phase(statistics.median(r["extract_seconds"] for r in records), extracted)}
+
+
+def _package_copy(extracted, package_folder):
+    """
+    Puts the extracted tree into package_folder the way the recipes of the tree under test do.
+    """
+    if hasattr(debiantools, "copy_linked"):
+        manifest = getattr(debiantools, "MANIFEST_FILE", None)
+        debiantools.copy_linked(BenchConanfile(extracted), "*", src=extracted, dst=package_folder,
+                                excludes=[manifest] if manifest else None)
+    else:
+        from conan.tools.files import copy
+        copy(BenchConanfile(extracted), "*", src=extracted, dst=package_folder)
+
+
+def _tree_size(folder):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(folder) for name in files
+               if not os.path.islink(os.path.join(root, name)))
+
+
+def bench_fixture(url, deb, workdir, repeat, threads):
+    sha256 = hashlib.sha256(deb).hexdigest()
+    phases = {}
+
+    # the plain transfer, for reference
+    seconds, _ = _timed(lambda: requests.get(url).content, repeat)
+    phases["download"] = _phase(seconds, len(deb))
+
+    trace_file = os.path.join(workdir, f"fetch-{sha256[:16]}.jsonl")
+
+    def fetch(cache_max_size):
+        build_folder = tempfile.mkdtemp(dir=workdir)
+        conanfile = BenchConanfile(build_folder, **{
+            "user.debiantools:cache_folder": os.path.join(workdir, "cache"),
+            "user.debiantools:cache_max_size": cache_max_size,
+            "user.debiantools:decompress_threads": threads,
+            "user.debiantools:trace_file": trace_file})
+        fetch_debs(conanfile, [(url, sha256)])
+        return build_folder
+    seconds, extracted = _timed(lambda: fetch(0), repeat)
+    # older trees only report the end to end phases
+    phases.update(_stage_phases(trace_file, len(deb)))
+    phases["end_to_end_uncached"] = _phase(seconds, len(deb))
+    fetch(2048)
+    seconds, cached = _timed(lambda: fetch(2048), repeat)
+    phases["end_to_end_cached"] = _phase(seconds, len(deb))
+
+    # from the cached extraction, which is what recipes package with a warm cache
+    seconds, _ = _timed(lambda: _package_copy(cached, tempfile.mkdtemp(dir=workdir)), repeat)
+    phases["package_copy"] = _phase(seconds, _tree_size(cached))
+
+    return {"deb_bytes": len(deb), "files": _files(extracted), "sha256": sha256, "phases": phases}
+
+
+def bench_all(debs, workdir, repeat, threads):
+    """
+    Times fetching all fixtures at once, as a recipe does with its packages.
+    """
+    def fetch():
+        conanfile = BenchConanfile(tempfile.mkdtemp(dir=workdir), **{
+            "user.debiantools:cache_max_size": 0,
+            "user.debiantools:decompress_threads": threads})
+        fetch_debs(conanfile, debs)
+    seconds, _ = _timed(fetch, repeat)
+    return {"seconds": round(seconds, 6), "packages": len(debs)}
+
+
+def bench_mirrors(mirror, deb_name, sha256, workdir, repeat):
+    """
+    Times fetching through a mirror list holding an unreachable, a slow and a fast stand-in mirror,
+    where the recipe url points at the unreachable one. Reports which mirror served the package,
+    with latency probing and with the configured order. None for trees without mirror support.
+    """
+    if not hasattr(debiantools, "MIRRORS"):
+        return None
+    # a port nothing listens on
+    down = ThreadingHTTPServer(("127.0.0.1", 0), _QuietHandler)
+    down_url = f"http://127.0.0.1:{down.server_address[1]}"
+    down.server_close()
+    results = {}
+    with MirrorServer(mirror, latency=0.5) as slow, MirrorServer(mirror, latency=0.01) as fast:
+        names = {down_url: "down", slow.url: "slow", fast.url: "fast"}
+        for probe in (True, False):
+            trace_file = os.path.join(workdir, f"mirrors-{probe}.jsonl")
+
+            def fetch():
+                # the mirrors are probed in the first run, the others reuse the ranking like later builds do
+                conanfile = BenchConanfile(tempfile.mkdtemp(dir=workdir), **{
+                    "user.debiantools:cache_folder": os.path.join(workdir, f"mirrors-cache-{probe}"),
+                    "user.debiantools:cache_max_size": 0,
+                    "user.debiantools:mirrors": {"bench": [down_url, slow.url, fast.url]},
+                    "user.debiantools:probe_mirrors": probe,
+                    "user.debiantools:trace_file": trace_file,
+                    "tools.files.download:retry": 0})
+                fetch_debs(conanfile, [(f"{down_url}/{deb_name}", sha256)])
+            seconds, _ = _timed(fetch, repeat)
+            records = []
+            if os.path.exists(trace_file):
+                with open(trace_file) as f:
+                    records = [json.loads(line) for line in f]
+            used = [r["mirror"] for r in records if r["phase"] == "fetch" and "mirror" in r]
+            results["probed" if probe else "configured_order"] = {
+                "seconds": round(seconds, 6), "mirror": names.get(used[-1].rsplit("/", 1)[0]) if used else None}
+    return results
+
+
+def _commit(tree):
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=tree,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    if results.get("all") and baseline.get("all"):
+        speedup = baseline["all"]["seconds"] / results["all"]["seconds"]
+        print(f"{'all':12} {'end_to_end_uncached':22} {baseline['all']['seconds']:9.4f}s -> "
+              f"{results['all']['seconds']:9.4f}s  x{speedup:.2f}")
+    for name, fixture in results["fixtures"].items():
+        base = baseline["fixtures"].get(name)
+        if base is None:
+            continue
+        for phase, values in fixture["phases"].items():
+            if phase in base["phases"] and values["seconds"] > 0:
+                speedup = base["phases"][phase]["seconds"] / values["seconds"]
+                print(f"{name:12} {phase:22} {base['phases'][phase]['seconds']:9.4f}s -> {values['seconds']:9.4f}s  x{speedup:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", nargs="+", choices=list(FIXTURES), default=list(FIXTURES))
+    parser.add_argument("--compression", choices=["xz", "gz", "zst", "none"], default="xz")
+    parser.add_argument("--threads", type=int, default=0, help="value of user.debiantools:decompress_threads")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per phase, the median is reported")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare against")
+    parser.add_argument("--tree", default=ROOT,
+                        help="checkout whose debiantools.py is benchmarked, trees that predate download_extract_debs() "
+                             "only support --compression xz")
+    args = parser.parse_args(argv)
+
+    global debiantools
+    sys.path.insert(0, os.path.abspath(args.tree))
+    debiantools = importlib.import_module("debiantools")
+
+    results = {"commit": _commit(args.tree), "python": platform.python_version(), "machine": platform.machine(),
+               "compression": args.compression, "threads": args.threads, "repeat": args.repeat, "fixtures": {}}
+    workdir = tempfile.mkdtemp(prefix="debiantools-bench-")
+    try:
+        mirror = os.path.join(workdir, "mirror")
+        os.makedirs(mirror)
+        compression = "" if args.compression == "none" else args.compression
+        with MirrorServer(mirror) as server:
+            for name in args.fixtures:
+                deb = build_deb(name.replace("-", ""), FIXTURES[name], compression)
+                with open(os.path.join(mirror, f"{name}.deb"), "wb") as f:
+                    f.write(deb)
+                results["fixtures"][name] = bench_fixture(f"{server.url}/{name}.deb", deb, workdir,
+                                                          args.repeat, args.threads)
+            results["all"] = bench_all([(f"{server.url}/{name}.deb", results["fixtures"][name]["sha256"])
+                                        for name in args.fixtures], workdir, args.repeat, args.threads)
+            name = args.fixtures[0]
+            results["mirrors"] = bench_mirrors(mirror, f"{name}.deb", results["fixtures"][name]["sha256"],
+                                               workdir, args.repeat)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
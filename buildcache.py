@@ -0,0 +1,335 @@
+import hashlib
+import inspect
+import io
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from conan.errors import ConanException
+from conan.tools.build import cross_building
+from conan.tools.env import VirtualBuildEnv
+
+try:
+    from conan.tools.build import load_toolchain_args
+except ImportError:
+    # Conan 1 has it in the files tools, without exporting it from the package
+    from conan.tools.files.files import load_toolchain_args
+
+# Compiler cache for the recipes that build from source. It is opt-in through the user.buildcache:launcher conf,
+# which names ccache, sccache or the path to one of them. generate() puts the launcher in front of the compiler
+# that the toolchain uses and build() runs inside compiler_cache(), which sets up the cache and reports the hits.
+# cached_autoreconf() and cached_configure() keep the generated configure scripts and the results of configure.
+
+def compiler_cache_launcher(conanfile) -> Optional[str]:
+    """
+    Returns the absolute path of the configured ccache or sccache executable, None if the compiler cache is off
+    """
+    launcher = conanfile.conf.get("user.buildcache:launcher", check_type=str)
+    if not launcher:
+        return None
+    path = shutil.which(launcher)
+    if path is None:
+        conanfile.output.warning(f"buildcache: compiler cache '{launcher}' not found, building without it")
+    return path
+
+def _is_sccache(launcher: str) -> bool:
+    return "sccache" in os.path.basename(launcher)
+
+def _autotools_compilers(conanfile) -> Tuple[Optional[str], Optional[str]]:
+    # the compilers that configure would pick, in the order AutotoolsToolchain and the build environment set them
+    executables = conanfile.conf.get("tools.build:compiler_executables", default={}, check_type=dict)
+    env = VirtualBuildEnv(conanfile).vars()
+    cc = executables.get("c") or env.get("CC") or os.environ.get("CC")
+    cxx = executables.get("cpp") or env.get("CXX") or os.environ.get("CXX")
+    if cross_building(conanfile):
+        # configure looks for <host triplet>-gcc itself, which can't be wrapped without knowing the toolchain
+        return cc, cxx
+    compiler = conanfile.settings.get_safe("compiler")
+    if compiler in ["clang", "apple-clang"]:
+        defaults = ("clang", "clang++")
+    elif compiler == "gcc":
+        defaults = ("gcc", "g++")
+    else:
+        defaults = ("cc", "c++")
+    return cc or defaults[0], cxx or defaults[1]
+
+def apply_compiler_cache(conanfile, toolchain) -> None:
+    """
+    Puts the compiler cache in front of the compilers of a CMakeToolchain, an AutotoolsToolchain or the CMake
+    helper of Conan 1 recipes. Does nothing unless user.buildcache:launcher is set.
+    The cache is keyed on the real compiler, which the toolchain still resolves, and its arguments
+    """
+    launcher = compiler_cache_launcher(conanfile)
+    if launcher is None:
+        return
+    if hasattr(toolchain, "cache_variables"):
+        # CMakeToolchain, read by project() so it has to be a cache variable
+        toolchain.cache_variables["CMAKE_C_COMPILER_LAUNCHER"] = launcher
+        toolchain.cache_variables["CMAKE_CXX_COMPILER_LAUNCHER"] = launcher
+    elif hasattr(toolchain, "definitions"):
+        # CMake build helper of Conan 1
+        toolchain.definitions["CMAKE_C_COMPILER_LAUNCHER"] = launcher
+        toolchain.definitions["CMAKE_CXX_COMPILER_LAUNCHER"] = launcher
+    elif hasattr(toolchain, "configure_args"):
+        # AutotoolsToolchain. Arguments of configure take precedence over the environment, which the build
+        # environment of the profile might set after the toolchain
+        cc, cxx = _autotools_compilers(conanfile)
+        if cc is None or cxx is None:
+            conanfile.output.warning("buildcache: set CC and CXX in the [buildenv] of the host profile to use "
+                                     "the compiler cache when cross building")
+            return
+        toolchain.configure_args.append(f"CC={launcher} {cc}")
+        toolchain.configure_args.append(f"CXX={launcher} {cxx}")
+    else:
+        raise ConanException(f"buildcache: unsupported toolchain {type(toolchain).__name__}")
+    conanfile.output.info(f"buildcache: compiling through {launcher}")
+
+def _cache_environment(conanfile, launcher: str) -> Dict[str, str]:
+    folder = conanfile.conf.get("user.buildcache:folder", check_type=str)
+    if _is_sccache(launcher):
+        # only read when the sccache server starts
+        return {"SCCACHE_DIR": folder} if folder else {}
+    env = {
+        # hash the compiler binary rather than its mtime, the same compiler can be installed in several places
+        "CCACHE_COMPILERCHECK": "content",
+        # the build folder changes with every package id and revision, paths below it are hashed relative to it
+        "CCACHE_BASEDIR": os.path.commonpath([os.path.abspath(conanfile.source_folder),
+                                              os.path.abspath(conanfile.build_folder)]),
+        # the working directory is only recorded in the debug information, don't let it change the key
+        "CCACHE_NOHASHDIR": "1",
+    }
+    if folder:
+        env["CCACHE_DIR"] = folder
+    return env
+
+def _cache_statistics(launcher: str) -> Optional[Tuple[int, int]]:
+    # (hits, misses) since the cache or the sccache server was started
+    if _is_sccache(launcher):
+        command = [launcher, "--show-stats", "--stats-format=json"]
+    else:
+        # needs ccache 4
+        command = [launcher, "--print-stats"]
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+    if result.returncode != 0:
+        return None
+    if _is_sccache(launcher):
+        stats = json.loads(result.stdout)["stats"]
+        return (sum(stats["cache_hits"]["counts"].values()), sum(stats["cache_misses"]["counts"].values()))
+    counters = {}
+    for line in result.stdout.splitlines():
+        key, _, value = line.partition("\t")
+        if value.isdigit():
+            counters[key] = int(value)
+    return (counters.get("direct_cache_hit", 0) + counters.get("preprocessed_cache_hit", 0),
+            counters.get("cache_miss", 0))
+
+@contextmanager
+def compiler_cache(conanfile) -> Iterator[None]:
+    """
+    Wraps the compile steps of build(): sets up the environment of the configured compiler cache and reports how
+    many compilations it answered at the end. Does nothing unless user.buildcache:launcher is set
+    """
+    launcher = compiler_cache_launcher(conanfile)
+    if launcher is None:
+        yield
+        return
+    env = _cache_environment(conanfile, launcher)
+    saved = {name: os.environ.get(name) for name in env}
+    os.environ.update(env)
+    try:
+        # the statistics are shared with all other builds, only the difference belongs to this one
+        before = _cache_statistics(launcher)
+        yield
+        after = _cache_statistics(launcher)
+        if before is not None and after is not None:
+            hits, misses = after[0] - before[0], after[1] - before[1]
+            total = hits + misses
+            rate = f" ({100 * hits / total:.0f}%)" if total else ""
+            conanfile.output.info(f"buildcache: {hits} of {total} compilations from {os.path.basename(launcher)}"
+                                  f"{rate}, {misses} misses")
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+def _configure_cache_folder(conanfile, kind: str) -> Optional[str]:
+    # None if the Autotools recipes should run autoreconf and configure from scratch
+    if not conanfile.conf.get("user.buildcache:configure_cache", default=True, check_type=bool):
+        return None
+    folder = conanfile.conf.get("user.buildcache:cache_folder", check_type=str)
+    if not folder:
+        folder = os.path.join(os.path.expanduser("~"), ".cache", "conan-buildcache")
+    return os.path.join(folder, kind)
+
+def _walk_files(folder: str) -> Iterator[str]:
+    # relative paths of the files below folder in a stable order, without the cache folder of autoconf
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = sorted(d for d in dirs if d != "autom4te.cache")
+        for name in sorted(files):
+            yield os.path.relpath(os.path.join(root, name), folder)
+
+def _tree_digest(folder: str) -> str:
+    digest = hashlib.sha256()
+    for path in _walk_files(folder):
+        full_path = os.path.join(folder, path)
+        digest.update(path.encode() + b"\0")
+        if os.path.islink(full_path):
+            digest.update(os.readlink(full_path).encode())
+        else:
+            with open(full_path, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+def _snapshot(folder: str) -> Dict[str, Tuple[int, int]]:
+    snapshot = {}
+    for path in _walk_files(folder):
+        stat = os.lstat(os.path.join(folder, path))
+        snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+def _run_output(conanfile, command: str) -> str:
+    # the output of a command run in the build environment, even if it fails
+    output = io.StringIO()
+    parameters = inspect.signature(conanfile.run).parameters
+    if "stdout" in parameters:
+        # quiet only exists in later versions of Conan 2
+        quiet = {"quiet": True} if "quiet" in parameters else {}
+        conanfile.run(command, stdout=output, ignore_errors=True, **quiet)
+    else:
+        # Conan 1
+        conanfile.run(command, output=output, ignore_errors=True)
+    return output.getvalue()
+
+def _autoreconf(autotools, build_script_folder: Optional[str], args: Optional[List[str]]) -> None:
+    if "build_script_folder" in inspect.signature(autotools.autoreconf).parameters:
+        autotools.autoreconf(build_script_folder, args)
+    elif build_script_folder:
+        raise ConanException("buildcache: the Autotools helper of Conan 1 only runs autoreconf in the source folder")
+    else:
+        autotools.autoreconf(args)
+
+def cached_autoreconf(conanfile, autotools, build_script_folder: Optional[str] = None,
+                      args: Optional[List[str]] = None) -> None:
+    """
+    Runs autotools.autoreconf() unless an earlier build already did it for the same sources, patches, arguments
+    and autotools versions, then the files that it generated are copied back into the source folder
+    """
+    cache_folder = _configure_cache_folder(conanfile, "autoreconf")
+    if cache_folder is None:
+        _autoreconf(autotools, build_script_folder, args)
+        return
+    script_folder = os.path.join(conanfile.source_folder, build_script_folder) if build_script_folder \
+        else conanfile.source_folder
+    versions = _run_output(conanfile, "autoreconf --version; autoconf --version; automake --version; "
+                                      "libtoolize --version")
+    # the sources are already patched, so their content stands for the source archive and the patch set
+    key = hashlib.sha256(json.dumps([_tree_digest(script_folder), args or [], versions,
+                                     load_toolchain_args(conanfile.generators_folder).get("autoreconf_args")])
+                         .encode()).hexdigest()
+    entry = os.path.join(cache_folder, key)
+    if os.path.isdir(entry):
+        files = os.path.join(entry, "files")
+        # the same time for all of them, newer than their inputs, so make doesn't run the autotools again
+        now = time.time_ns()
+        for path in _walk_files(files):
+            target = os.path.join(script_folder, path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(os.path.join(files, path), target, follow_symlinks=False)
+            os.utime(target, ns=(now, now), follow_symlinks=False)
+        conanfile.output.info(f"buildcache: reused the autoreconf output of an earlier build ({key[:12]})")
+        return
+
+    before = _snapshot(script_folder)
+    _autoreconf(autotools, build_script_folder, args)
+    changed = [path for path, stat in _snapshot(script_folder).items() if before.get(path) != stat]
+    os.makedirs(cache_folder, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=cache_folder, prefix=".staging-")
+    try:
+        for path in changed:
+            target = os.path.join(staging, "files", path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(os.path.join(script_folder, path), target, follow_symlinks=False)
+        # another build might have stored the same output in the meantime
+        os.rename(staging, entry)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+
+def _path_placeholders(conanfile) -> List[Tuple[str, str]]:
+    # the folders of the build differ for every package id and revision, longest first since they can be nested
+    folders = {os.path.abspath(conanfile.source_folder): "@SOURCE_FOLDER@",
+               os.path.abspath(conanfile.build_folder): "@BUILD_FOLDER@"}
+    return sorted(folders.items(), key=lambda item: len(item[0]), reverse=True)
+
+def _normalize_paths(conanfile, text: str) -> str:
+    for path, placeholder in _path_placeholders(conanfile):
+        text = text.replace(path, placeholder)
+    return text
+
+def _restore_paths(conanfile, text: str) -> str:
+    for path, placeholder in _path_placeholders(conanfile):
+        text = text.replace(placeholder, path)
+    return text
+
+def cached_configure(conanfile, autotools, build_script_folder: Optional[str] = None,
+                     args: Optional[List[str]] = None) -> None:
+    """
+    Runs autotools.configure() with a config.cache that is kept between builds of the same configure script,
+    arguments, compilers and toolchain, so the feature probes of an earlier build are answered from it
+    """
+    cache_folder = _configure_cache_folder(conanfile, "configure")
+    if cache_folder is None:
+        autotools.configure(build_script_folder, args)
+        return
+    script_folder = os.path.join(conanfile.source_folder, build_script_folder) if build_script_folder \
+        else conanfile.source_folder
+    digest = hashlib.sha256()
+    with open(os.path.join(script_folder, "configure"), "rb") as f:
+        digest.update(f.read())
+    digest.update(json.dumps(args or []).encode())
+    # the compilers, whose probes would be answered wrongly from the cache after an update in place
+    cc, cxx = _autotools_compilers(conanfile)
+    digest.update(json.dumps([conanfile.settings.get_safe("compiler"), conanfile.settings.get_safe("compiler.version"),
+                              _run_output(conanfile, f"{cc or '${CC:-cc}'} --version; "
+                                                     f"{cxx or '${CXX:-c++}'} --version")]).encode())
+    # the toolchain: configure arguments, compilers, flags and dependencies that the generators wrote
+    for name in sorted(os.listdir(conanfile.generators_folder)):
+        path = os.path.join(conanfile.generators_folder, name)
+        # deactivate scripts hold the environment of the process that activated the build environment
+        if name.startswith("deactivate") or not os.path.isfile(path):
+            continue
+        with open(path, encoding="utf-8", errors="replace") as f:
+            digest.update(name.encode() + b"\0" + _normalize_paths(conanfile, f.read()).encode())
+    key = digest.hexdigest()
+    entry = os.path.join(cache_folder, key + ".cache")
+    cache_file = os.path.join(conanfile.build_folder, "config.cache")
+
+    cached = os.path.isfile(entry)
+    if cached:
+        with open(entry, encoding="utf-8") as f:
+            content = _restore_paths(conanfile, f.read())
+        with open(cache_file, "w", encoding="utf-8") as f:
+            f.write(content)
+        conanfile.output.info(f"buildcache: running configure with the results of an earlier build ({key[:12]})")
+    try:
+        autotools.configure(build_script_folder, list(args or []) + [f"--cache-file={cache_file}"])
+    except ConanException:
+        if not cached:
+            raise
+        conanfile.output.warning("buildcache: configure failed with cached results, running it without them")
+        os.remove(cache_file)
+        # the Autotools helper keeps the arguments of the first call, --cache-file included
+        autotools.configure(build_script_folder)
+
+    with open(cache_file, encoding="utf-8") as f:
+        content = _normalize_paths(conanfile, f.read())
+    os.makedirs(cache_folder, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=cache_folder, prefix=".staging-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(temp_path, entry)
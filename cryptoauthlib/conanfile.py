@@ -7,6 +7,12 @@ from conan.tools.files import apply_conandata_patches, copy, export_conandata_pa
 
 from pathlib import Path
 
+try:
+    # exports copies it next to the recipe, so it is missing while exporting
+    from buildcache import apply_compiler_cache, compiler_cache
+except ImportError:
+    pass
+
 required_conan_version = ">=1.53.0"
 
 class CryptoAuthLib(ConanFile):
@@ -39,6 +45,7 @@ class CryptoAuthLib(ConanFile):
         'debugOutput': False,
         'debugOutputPkcs11': False
     }
+    exports = ["../buildcache.py"]
 
     def requirements(self):
         if self.settings.os == "Linux" and self.options['halHID']:
@@ -77,6 +84,7 @@ class CryptoAuthLib(ConanFile):
         tc.variables["ATCA_MBEDTLS"] = bool(self.options.mbedtls)
         tc.variables["PKCS11_DEBUG_ENABLE"] = bool(self.options.debugOutputPkcs11)
         tc.variables["ATCA_STRICT_C99"] = True
+        apply_compiler_cache(self, tc)
         tc.generate()
 
         deps = CMakeDeps(self)
@@ -85,8 +93,9 @@ class CryptoAuthLib(ConanFile):
     def build(self):
         apply_conandata_patches(self)
         cmake = CMake(self)
-        cmake.configure()
-        cmake.build()
+        with compiler_cache(self):
+            cmake.configure()
+            cmake.build()
 
     def package(self):
         # copy(self, "*.h", src=Path(self.build_folder)/"lib", dst=Path(self.package_folder)/"include"/"cryptoauthlib")
@@ -1,9 +1,51 @@
+import bz2
+import errno
+import fnmatch
+import functools
+import gzip
+import hashlib
+import io
+import json
+import lzma
 import os
-from typing import List
+import re
+import shutil
+import sqlite3
+import struct
+import subprocess
+import tarfile
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import ExitStack, contextmanager
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
 from conan import ConanFile
-from conan.tools.files import download, unzip
 from conan.errors import ConanException
 
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    # Python >= 3.14
+    from compression import zstd as compression_zstd
+except ImportError:
+    compression_zstd = None
+
 # Fork of the private function that used to be public in Conan 1: https://github.com/conan-io/conan/issues/14230
 # from conan.tools.gnu.get_gnu_triplet import _get_gnu_triplet
 # https://github.com/conan-io/conan/blob/release/1.60/conan/tools/gnu/get_gnu_triplet.py
@@ -117,15 +159,2163 @@ def translate_arch(conanfile: ConanFile) -> str:
     }
     return arch_names[str(conanfile.settings.arch)]
     
-def download_extract_deb(conanfile: ConanFile, url: str, sha256: str) -> None:
-    filename = "./download.deb"
-    deb_data_file = "data.tar.xz"
-    download(conanfile, url, filename, sha256=sha256)
-    # extract the payload from the debian file
-    conanfile.run(f"ar -x {filename} {deb_data_file}")
-    os.unlink(filename)
-    unzip(conanfile, deb_data_file)
-    os.unlink(deb_data_file)
+AR_MAGIC = b"!<arch>\n"
+AR_HEADER_SIZE = 60
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+DOWNLOAD_TIMEOUT = 60
+TRACE_FILE_ENV = "DEBIANTOOLS_TRACE_FILE"
+MIRROR_PROBE_TIMEOUT = 3
+# times an interrupted download is continued with a range request before it counts as failed
+DOWNLOAD_RESUMES = 3
+# seconds a download may take to get up to speed before it is checked against user.debiantools:mirror_min_speed
+MIRROR_MIN_SPEED_GRACE = 5
+
+# Archives the recipes download from. A url starting with any of the mirrors of an archive
+# can be fetched from all of them, the pinned sha256 guarantees the same file is used.
+MIRRORS = {
+    "ubuntu": ["http://us.archive.ubuntu.com/ubuntu", "http://archive.ubuntu.com/ubuntu"],
+    "ubuntu-ports": ["http://ports.ubuntu.com/ubuntu-ports"],
+    "debian": ["http://ftp.debian.org/debian", "http://ftp.us.debian.org/debian", "http://deb.debian.org/debian",
+               "http://archive.debian.org/debian"],
+}
+
+_trace_lock = threading.Lock()
+
+def _trace_file(conanfile: ConanFile) -> Optional[str]:
+    return conanfile.conf.get("user.debiantools:trace_file", check_type=str) or os.environ.get(TRACE_FILE_ENV) or None
+
+@contextmanager
+def _traced(conanfile: ConanFile, phase: str, **fields) -> Iterator[Optional[dict]]:
+    """
+    Measures the wall time of a phase and appends it as a JSON line to the trace file set through the
+    "user.debiantools:trace_file" conf or the DEBIANTOOLS_TRACE_FILE environment variable.
+    Yields the record, so the caller can add fields like "bytes", or None if tracing is disabled.
+    """
+    trace_file = _trace_file(conanfile)
+    if trace_file is None:
+        yield None
+        return
+    record = {"phase": phase, "recipe": f"{getattr(conanfile, 'name', None)}/{getattr(conanfile, 'version', None)}",
+              "pid": os.getpid(), "time": time.time(), **fields}
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = str(e) or type(e).__name__
+        raise
+    finally:
+        record["seconds"] = round(time.perf_counter() - start, 6)
+        if record.get("bytes") and record["seconds"] > 0:
+            record["mb_per_s"] = round(record["bytes"] / record["seconds"] / 1e6, 2)
+        with _trace_lock, open(trace_file, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+def _files_size(folder: str, files: List[str]) -> int:
+    return sum(os.lstat(os.path.join(folder, path)).st_size for path in files)
+
+class _ArMember:
+    """
+    Read-only file object limited to a single member of an ar archive. It reads straight from the
+    underlying stream, so a member can be handed to a streaming decompressor without copying it.
+    """
+
+    def __init__(self, fileobj: BinaryIO, size: int):
+        self._fileobj = fileobj
+        self._remaining = size
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._fileobj.read(size)
+        if len(data) < size:
+            raise ConanException("Unexpected end of file in ar archive member")
+        self._remaining -= len(data)
+        return data
+
+    def skip(self) -> None:
+        while self._remaining > 0:
+            self.read(min(self._remaining, 1024 * 1024))
+
+def iter_ar_members(fileobj: BinaryIO) -> Iterator[Tuple[str, _ArMember]]:
+    """
+    Iterates over the members of an ar archive (the container format of .deb files) in order.
+    Each member has to be consumed before advancing, unread data is skipped.
+
+    :param fileobj: binary stream positioned at the start of the archive
+    """
+    if fileobj.read(len(AR_MAGIC)) != AR_MAGIC:
+        raise ConanException("Not a debian package: missing ar archive header")
+    while True:
+        header = fileobj.read(AR_HEADER_SIZE)
+        if not header:
+            return
+        if len(header) != AR_HEADER_SIZE or header[58:60] != b"`\n":
+            raise ConanException("Corrupt ar archive header")
+        # GNU ar terminates member names with a '/'
+        name = header[0:16].decode("ascii").rstrip(" ").rstrip("/")
+        size = int(header[48:58].decode("ascii").strip())
+        member = _ArMember(fileobj, size)
+        yield name, member
+        member.skip()
+        # members are aligned to an even offset
+        if size % 2:
+            fileobj.read(1)
+
+def _included(path: str, includes: Optional[List[str]], excludes: Optional[List[str]]) -> bool:
+    """
+    Matches a relative path like "usr/lib/x86_64-linux-gnu/libudev.so" against fnmatch patterns,
+    where '*' also matches '/'. Without includes, everything not excluded is included.
+    """
+    if includes and not any(fnmatch.fnmatchcase(path, pattern) for pattern in includes):
+        return False
+    return not excludes or not any(fnmatch.fnmatchcase(path, pattern) for pattern in excludes)
+
+def extract_tar_stream(fileobj: BinaryIO, destination: str,
+                       includes: Optional[List[str]] = None, excludes: Optional[List[str]] = None) -> None:
+    """
+    Extracts an uncompressed tar stream into destination without seeking,
+    so it can directly consume the output of a streaming decompressor.
+    Members not matching the include/exclude patterns are skipped without being written,
+    parent folders of the included members are created as needed.
+    Absolute symlinks are rewritten relative to destination, so they point into the extracted tree.
+    """
+    extract_args = {}
+    if hasattr(tarfile, "fully_trusted_filter"):
+        # member paths are checked below, the default 'data' filter would also reset their permissions
+        extract_args["filter"] = "fully_trusted"
+    with tarfile.open(fileobj=fileobj, mode="r|") as tar:
+        for member in tar:
+            # entries are stored as "./usr/lib/..."
+            name = os.path.normpath(member.name)
+            if name == ".":
+                continue
+            if os.path.isabs(name) or name == ".." or name.startswith(".." + os.sep):
+                raise ConanException(f"Refusing to extract '{member.name}' outside of {destination}")
+            member.name = name
+            if not _included(name.replace(os.sep, "/"), includes, excludes):
+                continue
+            if member.issym() and os.path.isabs(member.linkname):
+                # debian packages link e.g. usr/lib/<triplet>/libuuid.so to /lib/<triplet>/libuuid.so.1.3.0,
+                # which doesn't exist when cross compiling
+                member.linkname = os.path.relpath(member.linkname.lstrip("/"), os.path.dirname(name) or ".")
+            tar.extract(member, destination, **extract_args)
+
+@contextmanager
+def _pipe_through(command: List[str], fileobj: BinaryIO) -> Iterator[BinaryIO]:
+    """
+    Runs fileobj through an external filter program. The input is fed from a separate thread,
+    so decompression runs in parallel to the extraction consuming the output.
+    """
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    errors = []
+
+    def feed():
+        try:
+            while True:
+                chunk = fileobj.read(DOWNLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                process.stdin.write(chunk)
+        except BrokenPipeError:
+            # the filter failed, which is reported through its exit code
+            pass
+        except BaseException as e:
+            errors.append(e)
+            # don't let the filter complain about its truncated input
+            process.kill()
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    try:
+        yield process.stdout
+        # consume what the reader didn't need (e.g. tar end-of-archive padding), so the whole input gets read
+        while process.stdout.read(DOWNLOAD_CHUNK_SIZE):
+            pass
+    except BaseException:
+        process.kill()
+        feeder.join()
+        # a failing download truncates the input, report the cause instead of the resulting decompression error
+        if errors:
+            raise errors[0]
+        raise
+    finally:
+        feeder.join()
+        process.stdout.close()
+        returncode = process.wait()
+    if errors:
+        raise errors[0]
+    if returncode != 0:
+        raise ConanException(f"'{' '.join(command)}' failed with exit code {returncode}")
+
+@contextmanager
+def _decompressed(fileobj: BinaryIO, compression: str, threads: int) -> Iterator[BinaryIO]:
+    """
+    Wraps fileobj into a streaming decompressor for the given data.tar suffix. When more than one
+    thread is allowed, the xz and zstd command line tools are used if available, which decompress in
+    parallel to the extraction (and in case of xz >= 5.4 also use multiple threads for multi-block files).
+
+    :param threads: number of decompression threads, 0 uses one per core
+    """
+    if compression == "":
+        yield fileobj
+    elif compression in (".xz", ".lzma"):
+        if threads != 1 and shutil.which("xz"):
+            with _pipe_through(["xz", "--decompress", "--stdout", f"--threads={threads}"], fileobj) as f:
+                yield f
+        else:
+            with lzma.LZMAFile(fileobj) as f:
+                yield f
+    elif compression == ".gz":
+        with gzip.GzipFile(fileobj=fileobj, mode="rb") as f:
+            yield f
+    elif compression == ".bz2":
+        with bz2.BZ2File(fileobj) as f:
+            yield f
+    elif compression == ".zst":
+        if (threads != 1 or (zstandard is None and compression_zstd is None)) and shutil.which("zstd"):
+            with _pipe_through(["zstd", "--decompress", "--stdout"], fileobj) as f:
+                yield f
+        elif zstandard is not None:
+            with zstandard.ZstdDecompressor().stream_reader(fileobj, read_across_frames=True) as f:
+                yield f
+        elif compression_zstd is not None:
+            with compression_zstd.ZstdFile(fileobj) as f:
+                yield f
+        else:
+            raise ConanException("Decompressing data.tar.zst requires the 'zstandard' python module or the zstd tool")
+    else:
+        raise ConanException(f"Unsupported compression of debian package payload 'data.tar{compression}'")
+
+def _read_control(fileobj: BinaryIO, compression: str) -> dict:
+    """
+    Reads the metadata of a package from its control.tar.* member: the fields of the control file
+    and the lines of the shlibs file, which maps the sonames of the package's libraries to dependencies.
+    """
+    metadata = {"control": {}, "shlibs": []}
+    with _decompressed(fileobj, compression, 1) as f, tarfile.open(fileobj=f, mode="r|") as tar:
+        for member in tar:
+            name = os.path.normpath(member.name)
+            if member.isfile() and name in ("control", "shlibs"):
+                text = tar.extractfile(member).read().decode("utf-8", errors="replace")
+                if name == "control":
+                    metadata["control"] = next(iter_stanzas(io.StringIO(text)), {})
+                else:
+                    metadata["shlibs"] = [line.strip() for line in text.splitlines()
+                                          if line.strip() and not line.startswith("#")]
+    return metadata
+
+class _StageTimer:
+    """
+    Splits the time of a streaming pipeline by stage. A stage only counts its own time, not the time it waits for
+    a stage it reads from on the same thread, so stages running in other threads (e.g. the input of an external
+    decompressor) are counted where they run.
+    """
+
+    def __init__(self, seconds: Dict[str, float]):
+        self.seconds = seconds
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enter(self) -> list:
+        stack = self._local.__dict__.setdefault("stack", [])
+        # [start, time of the nested stages]
+        frame = [time.perf_counter(), 0.0]
+        stack.append(frame)
+        return frame
+
+    def exit(self, stage: str, frame: list) -> None:
+        elapsed = time.perf_counter() - frame[0]
+        stack = self._local.stack
+        stack.pop()
+        if stack:
+            stack[-1][1] += elapsed
+        with self._lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + elapsed - frame[1]
+
+class _TimedStage:
+    # file object counting the time of its reads as a stage of a _StageTimer
+
+    def __init__(self, fileobj: BinaryIO, timer: _StageTimer, stage: str):
+        self._fileobj = fileobj
+        self._timer = timer
+        self._stage = stage
+
+    def read(self, size: int = -1) -> bytes:
+        frame = self._timer.enter()
+        try:
+            return self._fileobj.read(size)
+        finally:
+            self._timer.exit(self._stage, frame)
+
+def extract_deb(fileobj: BinaryIO, destination: str, threads: int = 1,
+                includes: Optional[List[str]] = None, excludes: Optional[List[str]] = None,
+                timings: Optional[Dict[str, float]] = None) -> dict:
+    """
+    Extracts the data payload of a debian package read from fileobj into destination,
+    without an external ar binary and without storing data.tar.* on disk.
+    The compression of the payload is detected from its member name.
+
+    :param threads: number of decompression threads, 0 uses one per core
+    :param includes: fnmatch patterns of the paths to extract, e.g. "usr/include/*"
+    :param excludes: fnmatch patterns of the paths to skip
+    :param timings: if given, the seconds spent reading fileobj ("read"), in the ar archive ("ar"), decompressing
+                    ("decompress") and extracting ("extract") are added to it
+    :return: the package's metadata {"control": {field: value}, "shlibs": [line]}
+    """
+    timer = _StageTimer(timings) if timings is not None else None
+    if timer is not None:
+        fileobj = _TimedStage(fileobj, timer, "read")
+    metadata = {"control": {}, "shlibs": []}
+    for name, member in iter_ar_members(fileobj):
+        if name.startswith("control.tar"):
+            metadata = _read_control(member, name[len("control.tar"):])
+        elif name.startswith("data.tar"):
+            if timer is not None:
+                member = _TimedStage(member, timer, "ar")
+            with _decompressed(member, name[len("data.tar"):], threads) as tar_stream:
+                if timer is None:
+                    extract_tar_stream(tar_stream, destination, includes, excludes)
+                else:
+                    frame = timer.enter()
+                    try:
+                        extract_tar_stream(_TimedStage(tar_stream, timer, "decompress"), destination, includes,
+                                           excludes)
+                    finally:
+                        timer.exit("extract", frame)
+            return metadata
+    raise ConanException("Debian package does not contain a data.tar payload")
+
+# Linux ioctl to share the data blocks of two files on copy-on-write filesystems (btrfs, xfs)
+FICLONE = 0x40049409
+
+def _reflink(src: str, dst: str) -> None:
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflinks are not supported on this platform")
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            os.unlink(dst)
+            raise
+    shutil.copystat(src, dst)
+
+def link_tree(src: str, dst: str, includes: Optional[List[str]] = None, excludes: Optional[List[str]] = None) -> List[str]:
+    """
+    Recreates the tree at src in dst without copying file contents if possible. Files are reflinked,
+    hardlinked if the filesystem can't reflink and only copied if neither works (e.g. across filesystems).
+    Files from the extraction cache are read-only, so a hardlinked one can't be changed in place by accident.
+    Symlinks are recreated with their original target, unless it is outside of src, see copy_linked().
+    Files and symlinks can be selected through include/exclude patterns relative to src, see extract_deb().
+
+    :return: paths of the created files and symlinks relative to dst
+    """
+    methods = [_reflink, os.link, shutil.copy2]
+    created = []
+    for root, dirs, files in os.walk(src):
+        rel_root = os.path.relpath(root, src)
+        dst_root = os.path.normpath(os.path.join(dst, rel_root))
+        if not includes and not excludes:
+            os.makedirs(dst_root, exist_ok=True)
+        for name in dirs + files:
+            src_path = os.path.join(root, name)
+            is_link = os.path.islink(src_path)
+            if name in dirs and not is_link:
+                continue
+            rel_path = os.path.normpath(os.path.join(rel_root, name))
+            if not _included(rel_path.replace(os.sep, "/"), includes, excludes):
+                continue
+            created.append(rel_path)
+            os.makedirs(dst_root, exist_ok=True)
+            dst_path = os.path.join(dst_root, name)
+            if is_link:
+                if os.path.lexists(dst_path):
+                    os.unlink(dst_path)
+                target = os.readlink(src_path)
+                resolved = os.path.normpath(os.path.join(rel_root, target))
+                if ((os.path.isabs(target) or resolved == ".." or resolved.startswith(".." + os.sep))
+                        and os.path.basename(target) != name):
+                    target = os.path.basename(target)
+                os.symlink(target, dst_path)
+            else:
+                # never write through an existing path, it might be a hardlink into the cache
+                if os.path.lexists(dst_path):
+                    os.unlink(dst_path)
+                while True:
+                    try:
+                        methods[0](src_path, dst_path)
+                        break
+                    except OSError:
+                        if len(methods) == 1:
+                            raise
+                        # don't retry a method that failed for the rest of the tree
+                        methods.pop(0)
+        # symlinks to directories have been recreated above, don't descend into them
+        dirs[:] = [d for d in dirs if not os.path.islink(os.path.join(root, d))]
+    return created
+
+def copy_linked(conanfile: ConanFile, pattern: str, src: Union[str, os.PathLike], dst: Union[str, os.PathLike],
+                excludes: Optional[List[str]] = None) -> None:
+    """
+    Replacement for conan.tools.files.copy() to put large extracted trees into the package folder.
+    When both folders are on the same filesystem, files are reflinked or hardlinked instead of copied,
+    which makes packaging proportional to the number of files instead of their size.
+    Symlinks are kept as they are, except for ones that point outside of src, e.g. usr/lib/<triplet>/libuuid.so to
+    ../../../lib/<triplet>/libuuid.so.1.3.0. They point to a file of the same name next to them instead, since
+    the recipes package lib/<triplet> and usr/lib/<triplet> into the same folder.
+
+    :param pattern: fnmatch pattern of the files to copy relative to src, where '*' also matches '/'
+    :param excludes: fnmatch patterns of the files to skip
+    """
+    with _traced(conanfile, "copy_linked", pattern=pattern, src=str(src)) as trace:
+        files = link_tree(str(src), str(dst), [pattern], excludes)
+        if trace is not None:
+            trace["files"] = len(files)
+            trace["bytes"] = _files_size(str(dst), files)
+    if trace is not None:
+        conanfile.output.info(f"debiantools: packaged {trace['files']} files matching '{pattern}' "
+                              f"({trace['bytes'] / 1e6:.1f} MB) in {trace['seconds']:.2f}s")
+
+def _tree_size(folder: str) -> int:
+    size = 0
+    for root, dirs, files in os.walk(folder):
+        for name in dirs + files:
+            size += os.lstat(os.path.join(root, name)).st_size
+    return size
+
+class _FileLock:
+    """
+    Advisory lock on a file shared by all processes using the cache. Several processes can hold
+    a shared lock at the same time, an exclusive lock excludes all others.
+    On platforms without fcntl (Windows) locking is a no-op.
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, "a")
+
+    def acquire(self, shared: bool = False, blocking: bool = True) -> bool:
+        if fcntl is None:
+            return True
+        flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        if not blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(self._file.fileno(), flags)
+        except BlockingIOError:
+            return False
+        return True
+
+    def release(self) -> None:
+        # closing the file releases the lock
+        self._file.close()
+
+def _cache_lock(cache: str, sha256: str) -> _FileLock:
+    # lock files live outside of the entries, so they survive the entry being evicted and recreated
+    locks = os.path.join(cache, "locks")
+    os.makedirs(locks, exist_ok=True)
+    return _FileLock(os.path.join(locks, sha256))
+
+def _cache_root(conanfile: ConanFile) -> str:
+    folder = conanfile.conf.get("user.debiantools:cache_folder", check_type=str)
+    if not folder:
+        cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        folder = os.path.join(cache_home, "conan-debian-packages")
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+def _cache_folder(conanfile: ConanFile) -> Optional[str]:
+    if _cache_max_size(conanfile) == 0:
+        return None
+    return _cache_root(conanfile)
+
+def _cache_max_size(conanfile: ConanFile) -> int:
+    # in MB, 0 disables the cache
+    return conanfile.conf.get("user.debiantools:cache_max_size", default=2048, check_type=int) * 1024 * 1024
+
+def _remove_leftover(path: str) -> None:
+    # leftovers of interrupted extractions and writes
+    try:
+        if time.time() - os.path.getmtime(path) > 24 * 3600:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+    except OSError:
+        pass
+
+def _evict_cache(conanfile: ConanFile, folder: str, keep: str) -> None:
+    """
+    Removes the least recently used entries and sysroots until the cache is below its size limit.
+    The entry or sysroot keep and entries that are locked by other builds are never removed.
+    """
+    max_size = _cache_max_size(conanfile)
+    entries = []
+    total = 0
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        if name.startswith("tmp-"):
+            _remove_leftover(path)
+            continue
+        try:
+            with open(os.path.join(path, "size")) as f:
+                size = int(f.read())
+            mtime = os.path.getmtime(path)
+        except (OSError, ValueError):
+            continue
+        total += size
+        if name != keep:
+            entries.append((mtime, size, path))
+    sysroots = os.path.join(folder, SYSROOTS_FOLDER)
+    for name in os.listdir(sysroots) if os.path.isdir(sysroots) else []:
+        path = os.path.join(sysroots, name)
+        if name.startswith("tmp-"):
+            _remove_leftover(path)
+            continue
+        try:
+            with open(path + ".json") as f:
+                size = json.load(f)["size"]
+            mtime = os.path.getmtime(path)
+        except (OSError, ValueError, KeyError):
+            continue
+        total += size
+        # builds use a sysroot after generate() without holding its lock, recently used ones are kept
+        if name != keep and time.time() - mtime > SYSROOT_MIN_AGE:
+            entries.append((mtime, size, path))
+    for _, size, path in sorted(entries):
+        if total <= max_size:
+            break
+        lock = _cache_lock(os.path.dirname(path), os.path.basename(path))
+        # entries in use by other builds are skipped
+        if lock.acquire(blocking=False):
+            conanfile.output.info(f"Evicting {os.path.basename(path)} from debian package cache")
+            # move the entry out of the way atomically, so it is never seen half deleted
+            trash = tempfile.mkdtemp(prefix="tmp-", dir=os.path.dirname(path))
+            try:
+                os.rename(path, os.path.join(trash, "entry"))
+                total -= size
+                if os.path.exists(path + ".json"):
+                    os.remove(path + ".json")
+            except OSError:
+                # already evicted by another build
+                pass
+            lock.release()
+            shutil.rmtree(trash, ignore_errors=True)
+        else:
+            lock.release()
+
+class _ChecksumError(ConanException):
+    pass
+
+class _HttpStatusError(ConanException):
+    pass
+
+class _HashingReader:
+    """
+    File object over a download that feeds every byte read through it into a hash,
+    so the package can be verified while it is being extracted.
+
+    :param min_speed: raise TimeoutError if the average speed drops below this many bytes per second
+    """
+
+    def __init__(self, fileobj: BinaryIO, url: str, min_speed: int = 0):
+        self._fileobj = fileobj
+        self.url = url
+        self._min_speed = min_speed
+        self._start = time.perf_counter()
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        # time spent waiting for the download, the rest of the extraction time is spent decompressing and writing
+        self.read_seconds = 0.0
+
+    def read(self, size: int = -1) -> bytes:
+        chunks = []
+        start = time.perf_counter()
+        # with a minimum speed, read about a second worth of data at a time to notice a slow download quickly
+        chunk_size = min(DOWNLOAD_CHUNK_SIZE, max(self._min_speed, 16 * 1024)) if self._min_speed else DOWNLOAD_CHUNK_SIZE
+        while size != 0:
+            chunk = self._fileobj.read(min(size, chunk_size) if size > 0 else chunk_size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            self.size += len(chunk)
+            if size > 0:
+                size -= len(chunk)
+            elapsed = time.perf_counter() - self._start
+            if self._min_speed and elapsed > MIRROR_MIN_SPEED_GRACE and self.size / elapsed < self._min_speed:
+                raise TimeoutError(f"download slower than {self._min_speed // 1024} KB/s")
+        self.read_seconds += time.perf_counter() - start
+        data = b"".join(chunks)
+        self.sha256.update(data)
+        return data
+
+    def drain(self) -> None:
+        while self.read(DOWNLOAD_CHUNK_SIZE):
+            pass
+
+# one session per server, so all packages fetched by a process share their connections
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+def _session(conanfile: ConanFile, url: str) -> requests.Session:
+    parsed = urlparse(url)
+    key = f"{parsed.scheme}://{parsed.netloc}"
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            jobs = conanfile.conf.get("user.debiantools:jobs", default=4, check_type=int)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, jobs))
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[key] = session
+        return session
+
+def _requester(conanfile: ConanFile, url: str):
+    """
+    Returns what downloads from url go through. Inside Conan that is its own requester, so the proxies, CA bundle,
+    client certificates, timeout and source credentials configured for Conan apply to the packages as well.
+    Without it (e.g. a recipe loaded outside of Conan) it is the pooled session of the server.
+    """
+    helpers = getattr(conanfile, "_conan_helpers", None)
+    # Conan 1 keeps it in the conanfile itself
+    requester = getattr(helpers, "requester", None) or getattr(conanfile, "_conan_requester", None)
+    return requester or _session(conanfile, url)
+
+class _ResumableDownload:
+    """
+    File object over the body of a streamed response. If the connection breaks, the download is
+    continued where it stopped with a range request, as long as the server supports them.
+    """
+
+    def __init__(self, conanfile: ConanFile, requester, url: str, response: requests.Response, verify: bool):
+        self._conanfile = conanfile
+        self._requester = requester
+        self._url = url
+        self._response = response
+        self._verify = verify
+        self._offset = 0
+        self._resumes = 0
+        # the original response is closed by its owner
+        self._own_response = False
+        # offsets of a content-encoded body don't match the decoded data
+        encoded = bool(response.headers.get("Content-Encoding"))
+        self._resumable = response.headers.get("Accept-Ranges") == "bytes" and not encoded
+        self._validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+        length = response.headers.get("Content-Length")
+        self._length = int(length) if length and length.isdigit() and not encoded else None
+
+    def read(self, size: int = -1) -> bytes:
+        while True:
+            try:
+                data = self._response.raw.read(size if size >= 0 else None)
+                # urllib3 < 2 doesn't notice a connection closed before the end of the body
+                if not data and size != 0 and self._length is not None and self._offset < self._length:
+                    raise ConnectionError(f"connection closed after {self._offset} of {self._length} bytes")
+                self._offset += len(data)
+                return data
+            except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError, ConnectionError,
+                    TimeoutError) as e:
+                if not self._resume(e):
+                    raise
+
+    def _resume(self, error: Exception) -> bool:
+        if not self._resumable or self._resumes == DOWNLOAD_RESUMES:
+            return False
+        self._resumes += 1
+        self._conanfile.output.warning(f"Download of {self._url} interrupted after {self._offset} bytes ({error}), "
+                                       f"resuming")
+        headers = {"Range": f"bytes={self._offset}-"}
+        if self._validator:
+            # only resume if the file didn't change in the meantime, otherwise the server sends all of it
+            headers["If-Range"] = self._validator
+        try:
+            response = self._requester.get(self._url, stream=True, verify=self._verify, timeout=DOWNLOAD_TIMEOUT,
+                                           headers=headers)
+        except requests.exceptions.RequestException:
+            return False
+        if response.status_code != 206:
+            response.close()
+            return False
+        response.raw.decode_content = True
+        self.close()
+        self._response = response
+        self._own_response = True
+        return True
+
+    def close(self) -> None:
+        if self._own_response:
+            self._response.close()
+
+@contextmanager
+def _open_url(conanfile: ConanFile, url: str) -> Iterator[BinaryIO]:
+    if url.startswith("file://"):
+        with open(url2pathname(urlparse(url).path), "rb") as f:
+            yield f
+        return
+    verify = conanfile.conf.get("tools.files.download:verify", default=True, check_type=bool)
+    requester = _requester(conanfile, url)
+    # Conan's requester replaces the timeout with the core.net.http:timeout conf
+    with requester.get(url, stream=True, verify=verify, timeout=DOWNLOAD_TIMEOUT) as response:
+        if response.status_code != 200:
+            raise _HttpStatusError(f"Error {response.status_code} downloading file {url}")
+        response.raw.decode_content = True
+        download = _ResumableDownload(conanfile, requester, url, response, verify)
+        try:
+            yield download
+        finally:
+            download.close()
+
+def _check_sha256(reader: _HashingReader, sha256: str) -> None:
+    computed = reader.sha256.hexdigest()
+    if computed != sha256:
+        raise _ChecksumError(f"sha256 signature failed for '{reader.url}' file.\n"
+                             f" Provided signature: {sha256}\n"
+                             f" Computed signature: {computed}")
+
+# mirrors of each archive ordered by their latency, cached in the cache folder for
+# "user.debiantools:mirror_ranking_max_age" hours
+MIRRORS_FILE = "mirrors.json"
+_mirror_rankings: Dict[str, List[str]] = {}
+_mirror_rankings_lock = threading.Lock()
+
+def _probe_latency(conanfile: ConanFile, mirror: str) -> float:
+    verify = conanfile.conf.get("tools.files.download:verify", default=True, check_type=bool)
+    start = time.perf_counter()
+    try:
+        # through the requester of the downloads, so the same proxies and certificates apply. Conan 1's requester
+        # has no HEAD, the response is streamed so only its headers are read
+        _requester(conanfile, mirror).get(mirror + "/", stream=True, verify=verify,
+                                          timeout=MIRROR_PROBE_TIMEOUT).close()
+    except requests.exceptions.RequestException:
+        return float("inf")
+    return time.perf_counter() - start
+
+def _probe_mirrors(conanfile: ConanFile, mirrors: List[str]) -> List[Tuple[float, str]]:
+    executor = ThreadPoolExecutor(max_workers=len(mirrors))
+    futures = [executor.submit(_probe_latency, conanfile, mirror) for mirror in mirrors]
+    # Conan's requester replaces the probe timeout with its own, mirrors that didn't answer in time are not waited for
+    wait(futures, timeout=MIRROR_PROBE_TIMEOUT)
+    executor.shutdown(wait=False)
+    latencies = [future.result() if future.done() else float("inf") for future in futures]
+    # unreachable mirrors are still tried last, in their configured order
+    return [(latency, mirror) for latency, _, mirror in sorted(zip(latencies, range(len(mirrors)), mirrors))]
+
+def _ranked_mirrors(conanfile: ConanFile, mirrors: List[str]) -> List[str]:
+    if len(mirrors) < 2 or not conanfile.conf.get("user.debiantools:probe_mirrors", default=True, check_type=bool):
+        return mirrors
+    key = " ".join(mirrors)
+    # the lock makes concurrent downloads from the same archive wait for a single probe
+    with _mirror_rankings_lock:
+        if key in _mirror_rankings:
+            return _mirror_rankings[key]
+        max_age = conanfile.conf.get("user.debiantools:mirror_ranking_max_age", default=24, check_type=int) * 3600
+        cache = _cache_root(conanfile)
+        path = os.path.join(cache, MIRRORS_FILE)
+        # other builds wait for the probe as well instead of probing at the same time
+        lock = _cache_lock(cache, MIRRORS_FILE)
+        lock.acquire()
+        try:
+            try:
+                with open(path) as f:
+                    rankings = json.load(f)
+            except (OSError, ValueError):
+                rankings = {}
+            cached = rankings.get(key)
+            if cached and 0 <= time.time() - cached["probed"] < max_age:
+                ranking = cached["ranking"]
+            else:
+                latencies = _probe_mirrors(conanfile, mirrors)
+                ranking = [mirror for _, mirror in latencies]
+                conanfile.output.info(f"Mirror ranking: {', '.join(ranking)}")
+                # without network all mirrors are unreachable, that ranking is not worth keeping
+                if any(latency != float("inf") for latency, _ in latencies):
+                    rankings[key] = {"probed": time.time(), "ranking": ranking}
+                    with open(path + ".tmp", "w") as f:
+                        json.dump(rankings, f, indent=1)
+                    os.replace(path + ".tmp", path)
+        finally:
+            lock.release()
+        _mirror_rankings[key] = ranking
+        return ranking
+
+def _mirror_urls(conanfile: ConanFile, url: str) -> List[str]:
+    """
+    Returns the urls the file at url can be downloaded from, fastest mirror first. The archive is detected by the
+    url starting with one of its mirrors, mirrors are taken from MIRRORS and the "user.debiantools:mirrors" conf,
+    a dict like {"debian": ["http://ftp.de.debian.org/debian"]} which replaces the built-in list of an archive.
+    Urls of other servers are returned as they are.
+    """
+    configured = conanfile.conf.get("user.debiantools:mirrors", default={}, check_type=dict)
+    for archive in set(MIRRORS) | set(configured):
+        known = [m.rstrip("/") for m in MIRRORS.get(archive, []) + configured.get(archive, [])]
+        for mirror in known:
+            if url.startswith(mirror + "/"):
+                path = url[len(mirror):]
+                mirrors = [m.rstrip("/") for m in configured.get(archive, MIRRORS.get(archive, []))]
+                return [m + path for m in _ranked_mirrors(conanfile, mirrors)] or [url]
+    return [url]
+
+def _download_extract(conanfile: ConanFile, url: str, sha256: str, destination: str,
+                      includes: Optional[List[str]], excludes: Optional[List[str]],
+                      timings: Optional[Dict[str, float]] = None) -> Tuple[_HashingReader, dict]:
+    """
+    Streams the package at url into the extractor while hashing it, the package itself is never stored.
+    Since the data is only verified once the download has finished, destination has to be a staging folder
+    that is discarded if this raises.
+
+    :param timings: receives the stage timings of extract_deb() for the successful download
+
+    :return: the reader of the successful download, which holds its size and timing, and the package's metadata
+    """
+    retry = conanfile.conf.get("tools.files.download:retry", default=2, check_type=int)
+    retry_wait = conanfile.conf.get("tools.files.download:retry_wait", default=5, check_type=int)
+    threads = conanfile.conf.get("user.debiantools:decompress_threads", default=0, check_type=int)
+    # in KB/s, only enforced while there is another mirror left to try
+    min_speed = conanfile.conf.get("user.debiantools:mirror_min_speed", default=50, check_type=int) * 1024
+    urls = _mirror_urls(conanfile, url)
+    for attempt in range(retry + 1):
+        for i, candidate in enumerate(urls):
+            last = i + 1 == len(urls)
+            try:
+                conanfile.output.info(f"Downloading {candidate}")
+                with _open_url(conanfile, candidate) as f:
+                    reader = _HashingReader(f, candidate, 0 if last else min_speed)
+                    try:
+                        if timings is not None:
+                            timings.clear()
+                        metadata = extract_deb(reader, destination, threads, includes, excludes, timings)
+                    except (ConnectionError, TimeoutError):
+                        raise
+                    except (ConanException, tarfile.TarError, EOFError, OSError, lzma.LZMAError, zlib.error):
+                        # a corrupt or wrong file is best reported as checksum mismatch
+                        reader.drain()
+                        _check_sha256(reader, sha256)
+                        raise
+                    reader.drain()
+                _check_sha256(reader, sha256)
+                return reader, metadata
+            except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError, ConnectionError, TimeoutError) as e:
+                error = ConanException(f"Error downloading file {candidate}: {e}")
+                transient = True
+            except (_HttpStatusError, _ChecksumError) as e:
+                # another mirror might still have the right file, but retrying the same ones won't help
+                error = e
+                transient = False
+            shutil.rmtree(destination, ignore_errors=True)
+            if not last:
+                conanfile.output.warning(f"{error}, trying {urls[i + 1]}")
+        if not transient or attempt == retry:
+            raise error
+        conanfile.output.warning(f"{error}, retrying in {retry_wait}s")
+        time.sleep(retry_wait)
+
+def _make_read_only(tree: str) -> None:
+    # the files are hardlinked into build and package folders, where they must not be written to in place
+    for root, _, files in os.walk(tree):
+        for name in files:
+            path = os.path.join(root, name)
+            if not os.path.islink(path):
+                os.chmod(path, os.lstat(path).st_mode & ~0o222)
+
+def _tree_manifest(tree: str) -> Dict[str, List[int]]:
+    # [size, mtime, mode] of the files and symlinks of an extracted payload by their path
+    manifest = {}
+    for root, dirs, files in os.walk(tree):
+        for name in files + [name for name in dirs if os.path.islink(os.path.join(root, name))]:
+            path = os.path.join(root, name)
+            st = os.lstat(path)
+            manifest[os.path.relpath(path, tree).replace(os.sep, "/")] = [st.st_size, st.st_mtime_ns, st.st_mode]
+    return manifest
+
+def _entry_intact(entry: str) -> bool:
+    """
+    Checks that the payload of a cache entry still has the files it was published with, unchanged. Its files are
+    hardlinked into build folders where they might be made writable and changed, or removed.
+    Entries without manifest are not trusted.
+    """
+    try:
+        with open(os.path.join(entry, "manifest.json")) as f:
+            manifest = json.load(f)
+        return _tree_manifest(os.path.join(entry, "tree")) == manifest
+    except (OSError, ValueError):
+        return False
+
+def _fetch_tree(conanfile: ConanFile, url: str, sha256: str, cache: str, evict: bool,
+                includes: Optional[List[str]] = None, excludes: Optional[List[str]] = None) -> Tuple[str, _FileLock]:
+    """
+    Returns the folder holding the extracted payload of the package with the given sha256,
+    downloading and extracting it into the cache first if needed. Filters are only passed
+    for single use caches, a shared cache always holds the complete payload.
+
+    The returned lock is held shared, which protects the folder from being evicted until it is released.
+    Only one process downloads a missing package, others wait for it to be published.
+    """
+    entry = os.path.join(cache, sha256)
+    lock = _cache_lock(cache, sha256)
+    try:
+        with _traced(conanfile, "fetch", url=url, sha256=sha256) as trace:
+            lock.acquire(shared=True)
+            if os.path.isdir(entry) and _entry_intact(entry):
+                # the modification time of an entry is its last use for the LRU eviction
+                os.utime(entry)
+                if trace is not None:
+                    trace["cache"] = "hit"
+                return os.path.join(entry, "tree"), lock
+
+            lock.acquire()
+            # it might have been published while waiting for the exclusive lock
+            if os.path.isdir(entry) and not _entry_intact(entry):
+                conanfile.output.warning(f"debiantools: cached payload of {url} was modified, extracting it again")
+                # nobody else uses it while the lock is held exclusively
+                trash = tempfile.mkdtemp(prefix="tmp-", dir=cache)
+                os.rename(entry, os.path.join(trash, "entry"))
+                shutil.rmtree(trash, ignore_errors=True)
+            if not os.path.isdir(entry):
+                # the payload is extracted while downloading, it only becomes visible once it has been verified
+                staging = tempfile.mkdtemp(prefix="tmp-", dir=cache)
+                try:
+                    tree = os.path.join(staging, "tree")
+                    timings = {} if trace is not None else None
+                    reader, metadata = _download_extract(conanfile, url, sha256, tree, includes, excludes, timings)
+                    size = _tree_size(tree)
+                    _make_read_only(tree)
+                    with open(os.path.join(staging, "metadata.json"), "w") as f:
+                        json.dump(metadata, f)
+                    with open(os.path.join(staging, "size"), "w") as f:
+                        f.write(str(size))
+                    with open(os.path.join(staging, "manifest.json"), "w") as f:
+                        json.dump(_tree_manifest(tree), f)
+                    os.rename(staging, entry)
+                finally:
+                    shutil.rmtree(staging, ignore_errors=True)
+                if trace is not None:
+                    trace.update(cache="miss", mirror=reader.url, bytes=reader.size,
+                                 download_seconds=round(reader.read_seconds, 6), extracted_bytes=size,
+                                 **{f"{stage}_seconds": round(timings.get(stage, 0.0), 6)
+                                    for stage in ("ar", "decompress", "extract")})
+            elif trace is not None:
+                trace["cache"] = "waited"
+            lock.acquire(shared=True)
+        if evict:
+            _evict_cache(conanfile, cache, keep=sha256)
+        return os.path.join(entry, "tree"), lock
+    except BaseException:
+        lock.release()
+        raise
+
+MANIFEST_FILE = "debiantools_manifest.json"
+
+def _manifest_key(debs: List[Tuple[str, str]], includes: Optional[List[str]], excludes: Optional[List[str]]) -> str:
+    # urls are not part of the key, the same package might be fetched from a different mirror
+    return hashlib.sha256(json.dumps([[sha256 for _, sha256 in debs], includes, excludes]).encode()).hexdigest()
+
+def _load_manifest(folder: str) -> dict:
+    try:
+        with open(os.path.join(folder, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _file_stats(folder: str, files: List[str]) -> Optional[dict]:
+    """
+    Returns [size, mtime] of all files (without following symlinks), or None if any of them is missing.
+    """
+    stats = {}
+    for path in files:
+        try:
+            st = os.lstat(os.path.join(folder, path))
+        except OSError:
+            return None
+        stats[path.replace(os.sep, "/")] = [st.st_size, st.st_mtime_ns]
+    return stats
+
+def _extracted_before(conanfile: ConanFile, key: str) -> bool:
+    """
+    Checks whether the build folder still holds the unmodified files of a previous extraction with the same key.
+    """
+    record = _load_manifest(conanfile.build_folder).get(key)
+    if not record or not record.get("files"):
+        return False
+    return _file_stats(conanfile.build_folder, list(record["files"])) == record["files"]
+
+def _load_metadata(tree: str) -> dict:
+    # entries cached by older versions have no metadata
+    try:
+        with open(os.path.join(os.path.dirname(tree), "metadata.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"control": {}, "shlibs": []}
+
+def _record_extraction(conanfile: ConanFile, key: str, debs: List[Tuple[str, str]], files: List[str],
+                       metadata: Dict[str, dict]) -> None:
+    manifest = _load_manifest(conanfile.build_folder)
+    manifest[key] = {"debs": [{"url": url, "sha256": sha256, **metadata[sha256]} for url, sha256 in debs],
+                     "files": _file_stats(conanfile.build_folder, files)}
+    path = os.path.join(conanfile.build_folder, MANIFEST_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+def download_extract_debs(conanfile: ConanFile, debs: List[Tuple[str, str]],
+                          includes: Optional[List[str]] = None, excludes: Optional[List[str]] = None) -> None:
+    """
+    Downloads the debian packages given as (url, sha256) pairs concurrently, verifies them and extracts
+    their payloads into the build folder. Nothing is written to the build folder unless all packages
+    could be fetched; the error of the first failing package in list order is raised.
+    Payloads are extracted in list order, so later packages overwrite files of earlier ones.
+
+    Extracted payloads are kept in a local cache keyed by sha256 (configured through the
+    "user.debiantools:cache_folder" and "user.debiantools:cache_max_size" confs), so repeated builds
+    only link the files into the build folder. The number of concurrent downloads is set through
+    "user.debiantools:jobs".
+
+    The extracted files are recorded in a manifest in the build folder. If the same packages are requested again
+    (e.g. when re-running a build after package() failed), nothing is fetched as long as none of the files changed.
+
+    :param includes: fnmatch patterns of the payload paths to extract, where '*' also matches '/',
+                     e.g. "usr/include/*". Everything is extracted if not given.
+    :param excludes: fnmatch patterns of the payload paths to skip
+    """
+    debs = [(url, sha256.lower()) for url, sha256 in debs]
+    for url, sha256 in debs:
+        if not re.fullmatch("[0-9a-f]{64}", sha256):
+            raise ConanException(f"Invalid sha256 '{sha256}' for {url}")
+    key = _manifest_key(debs, includes, excludes)
+    if _extracted_before(conanfile, key):
+        conanfile.output.info("Debian packages already extracted in build folder, skipping download")
+        return
+    with _traced(conanfile, "download_extract_debs", packages=len(debs)) as trace:
+        files, fetch_seconds, metadata = _download_extract_debs(conanfile, debs, includes, excludes,
+                                                                conanfile.build_folder)
+        _record_extraction(conanfile, key, debs, files, metadata)
+        if trace is not None:
+            trace["files"] = len(files)
+            trace["bytes"] = _files_size(conanfile.build_folder, files)
+            trace["fetch_seconds"] = round(fetch_seconds, 6)
+    if trace is not None:
+        conanfile.output.info(f"debiantools: extracted {len(debs)} debian packages ({trace['files']} files, "
+                              f"{trace['bytes'] / 1e6:.1f} MB) in {trace['seconds']:.2f}s, "
+                              f"{trace['fetch_seconds']:.2f}s of it fetching")
+
+def _download_extract_debs(conanfile: ConanFile, debs: List[Tuple[str, str]], includes: Optional[List[str]],
+                           excludes: Optional[List[str]], destination: str) -> Tuple[List[str], float, Dict[str, dict]]:
+    """
+    :return: the files created in destination, the time spent fetching the packages and their metadata by sha256
+    """
+    # a package listed twice would wait for its own cache lock
+    unique_debs = []
+    for url, sha256 in debs:
+        if sha256 not in (unique_sha256 for _, unique_sha256 in unique_debs):
+            unique_debs.append((url, sha256))
+
+    start = time.perf_counter()
+    cache = _cache_folder(conanfile)
+    staging = None
+    if cache is None:
+        staging = cache = tempfile.mkdtemp(prefix="tmp-", dir=destination)
+    try:
+        jobs = max(1, min(len(unique_debs), conanfile.conf.get("user.debiantools:jobs", default=4, check_type=int)))
+        with ThreadPoolExecutor(max_workers=jobs) as executor, ExitStack() as locks:
+            if staging is None:
+                futures = [executor.submit(_fetch_tree, conanfile, url, sha256, cache, True)
+                           for url, sha256 in unique_debs]
+            else:
+                # without cache, skip unneeded files already while extracting
+                futures = [executor.submit(_fetch_tree, conanfile, url, sha256, cache, False, includes, excludes)
+                           for url, sha256 in unique_debs]
+            # waits for all downloads to finish and raises in list order, independent of completion order
+            wait(futures)
+            fetch_seconds = time.perf_counter() - start
+            for future in futures:
+                if future.exception() is None:
+                    locks.callback(future.result()[1].release)
+            trees = {sha256: future.result()[0] for (_, sha256), future in zip(unique_debs, futures)}
+            metadata = {sha256: _load_metadata(tree) for sha256, tree in trees.items()}
+            files = []
+            with _traced(conanfile, "materialize", packages=len(debs)) as trace:
+                for _, sha256 in debs:
+                    files.extend(link_tree(trees[sha256], destination, includes, excludes))
+                if trace is not None:
+                    trace["files"] = len(files)
+                    trace["bytes"] = _files_size(destination, files)
+    finally:
+        if staging is not None:
+            shutil.rmtree(staging, ignore_errors=True)
+    return files, fetch_seconds, metadata
+
+def download_extract_deb(conanfile: ConanFile, url: str, sha256: str,
+                         includes: Optional[List[str]] = None, excludes: Optional[List[str]] = None) -> None:
+    download_extract_debs(conanfile, [(url, sha256)], includes, excludes)
+
+INDEX_FILE = "packages.sqlite"
+# bumped whenever the schema changes, older databases are recreated
+INDEX_VERSION = 3
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS releases (archive TEXT, suite TEXT, fetched REAL, PRIMARY KEY (archive, suite));
+CREATE TABLE IF NOT EXISTS indexes (archive TEXT, suite TEXT, component TEXT, arch TEXT, sha256 TEXT,
+                                    PRIMARY KEY (archive, suite, component, arch));
+CREATE TABLE IF NOT EXISTS packages (archive TEXT, suite TEXT, component TEXT, arch TEXT, package TEXT,
+                                     version TEXT, filename TEXT, sha256 TEXT, size INTEGER, depends TEXT,
+                                     multi_arch TEXT);
+CREATE INDEX IF NOT EXISTS packages_lookup ON packages (package, archive, arch, suite);
+CREATE TABLE IF NOT EXISTS provides (archive TEXT, suite TEXT, component TEXT, arch TEXT, name TEXT, package TEXT);
+CREATE INDEX IF NOT EXISTS provides_lookup ON provides (name, archive, arch, suite);
+CREATE TABLE IF NOT EXISTS closures (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# packages every toolchain's sysroot contains, which are never reported as missing dependencies
+BASE_SYSTEM_PACKAGES = ["libc6", "libgcc1", "libgcc-s1", "libstdc++6"]
+
+_index_lock = threading.Lock()
+
+class DebPackage(NamedTuple):
+    package: str
+    version: str
+    arch: str
+    url: str
+    sha256: str
+    size: int
+    depends: str
+
+def _version_order(c: str) -> int:
+    if c == "~":
+        return -1
+    if c.isdigit():
+        return 0
+    if c.isalpha():
+        return ord(c)
+    return ord(c) + 256
+
+def _compare_version_part(a: str, b: str) -> int:
+    # the algorithm of dpkg's verrevcmp(): alternating non-digit parts compared by character order,
+    # where '~' sorts before everything, and digit parts compared numerically
+    i = j = 0
+    while i < len(a) or j < len(b):
+        while (i < len(a) and not a[i].isdigit()) or (j < len(b) and not b[j].isdigit()):
+            ac = _version_order(a[i]) if i < len(a) else 0
+            bc = _version_order(b[j]) if j < len(b) else 0
+            if ac != bc:
+                return ac - bc
+            i += 1
+            j += 1
+        start_a, start_b = i, j
+        while i < len(a) and a[i].isdigit():
+            i += 1
+        while j < len(b) and b[j].isdigit():
+            j += 1
+        diff = int(a[start_a:i] or 0) - int(b[start_b:j] or 0)
+        if diff:
+            return diff
+    return 0
+
+def compare_versions(a: str, b: str) -> int:
+    """
+    Compares two Debian package versions ("[epoch:]upstream[-revision]") like dpkg --compare-versions.
+
+    :return: a negative number if a is older than b, 0 if they are equal and a positive number if a is newer
+    """
+    def split(version):
+        epoch, _, rest = version.partition(":") if ":" in version else ("0", "", version)
+        upstream, _, revision = rest.rpartition("-") if "-" in rest else (rest, "", "")
+        return int(epoch), upstream, revision
+    epoch_a, upstream_a, revision_a = split(a)
+    epoch_b, upstream_b, revision_b = split(b)
+    if epoch_a != epoch_b:
+        return epoch_a - epoch_b
+    return _compare_version_part(upstream_a, upstream_b) or _compare_version_part(revision_a, revision_b)
+
+def iter_stanzas(lines: Iterator[str]) -> Iterator[dict]:
+    """
+    Parses the deb822 format of Packages, Release and control files into one dict per paragraph.
+    Continuation lines of multi-line fields are joined with newlines.
+    """
+    stanza = {}
+    key = None
+    for line in lines:
+        line = line.rstrip("\n")
+        if not line.strip():
+            if stanza:
+                yield stanza
+            stanza = {}
+            key = None
+        elif line[0] in " \t":
+            if key is not None:
+                stanza[key] += "\n" + line.strip()
+        else:
+            key, _, value = line.partition(":")
+            stanza[key] = value.strip()
+    if stanza:
+        yield stanza
+
+def _archive_mirrors(conanfile: ConanFile, archive: str) -> List[str]:
+    configured = conanfile.conf.get("user.debiantools:mirrors", default={}, check_type=dict)
+    if archive in configured or archive in MIRRORS:
+        return [m.rstrip("/") for m in configured.get(archive, MIRRORS.get(archive))]
+    if "://" in archive:
+        return [archive.rstrip("/")]
+    raise ConanException(f"Unknown debian archive '{archive}', add its mirrors to user.debiantools:mirrors")
+
+def _fetch_archive_file(conanfile: ConanFile, archive: str, paths: List[str]) -> bytes:
+    """
+    Reads the first of paths that exists in the archive, either from its local snapshot set through the
+    "user.debiantools:index_snapshots" conf, or from the fastest mirror that has it.
+    """
+    snapshot = conanfile.conf.get("user.debiantools:index_snapshots", default={}, check_type=dict).get(archive)
+    errors = []
+    for path in paths:
+        if snapshot:
+            try:
+                with open(os.path.join(snapshot, *path.split("/")), "rb") as f:
+                    return f.read()
+            except OSError as e:
+                errors.append(str(e))
+            continue
+        for mirror in _ranked_mirrors(conanfile, _archive_mirrors(conanfile, archive)):
+            try:
+                with _open_url(conanfile, f"{mirror}/{path}") as f:
+                    return f.read()
+            except (ConanException, requests.exceptions.RequestException, urllib3.exceptions.HTTPError,
+                    ConnectionError, TimeoutError) as e:
+                errors.append(str(e))
+    raise ConanException(f"Could not fetch {paths[-1]} of debian archive '{archive}':\n" + "\n".join(errors))
+
+def _open_index(conanfile: ConanFile) -> sqlite3.Connection:
+    db = sqlite3.connect(os.path.join(_cache_root(conanfile), INDEX_FILE), timeout=60)
+    if db.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+        with db:
+            for (table,) in db.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall():
+                db.execute(f"DROP TABLE {table}")
+        db.execute(f"PRAGMA user_version={INDEX_VERSION}")
+    db.executescript(INDEX_SCHEMA)
+    return db
+
+def _refresh_index(conanfile: ConanFile, db: sqlite3.Connection, archive: str, suite: str,
+                   components: List[str], arch: str) -> None:
+    """
+    Brings the package lists of a suite up to date. The Release file is fetched again once it is older than
+    "user.debiantools:index_max_age" hours; package lists are only downloaded if their hash in it changed.
+    """
+    max_age = conanfile.conf.get("user.debiantools:index_max_age", default=24, check_type=int) * 3600
+    fetched = db.execute("SELECT fetched FROM releases WHERE archive=? AND suite=?", (archive, suite)).fetchone()
+    indexed = db.execute(f"SELECT COUNT(*) FROM indexes WHERE archive=? AND suite=? AND arch=? "
+                         f"AND component IN ({','.join('?' * len(components))})",
+                         (archive, suite, arch, *components)).fetchone()[0]
+    if fetched and time.time() - fetched[0] < max_age and indexed == len(components):
+        return
+
+    # the signature of the Release file is not checked, the index only helps to find packages and their
+    # sha256, which are still verified against the downloaded packages
+    release = next(iter_stanzas(io.StringIO(
+        _fetch_archive_file(conanfile, archive, [f"dists/{suite}/Release"]).decode("utf-8"))), {})
+    hashes = {}
+    for line in release.get("SHA256", "").splitlines():
+        if line.strip():
+            sha256, size, path = line.split()
+            hashes[path] = sha256
+    for component in components:
+        name = f"{component}/binary-{arch}/Packages"
+        suffix = next((suffix for suffix in (".xz", ".gz", "") if name + suffix in hashes), None)
+        if suffix is None:
+            raise ConanException(f"Debian archive '{archive}' has no {name} in suite {suite}")
+        sha256 = hashes[name + suffix]
+        current = db.execute("SELECT sha256 FROM indexes WHERE archive=? AND suite=? AND component=? AND arch=?",
+                             (archive, suite, component, arch)).fetchone()
+        if current and current[0] == sha256:
+            continue
+        conanfile.output.info(f"Updating package index {archive} {suite}/{name}")
+        paths = [f"dists/{suite}/{name}{suffix}"]
+        if release.get("Acquire-By-Hash") == "yes":
+            # immune to the file being replaced between reading Release and downloading it
+            paths.insert(0, f"dists/{suite}/{component}/binary-{arch}/by-hash/SHA256/{sha256}")
+        data = _fetch_archive_file(conanfile, archive, paths)
+        if hashlib.sha256(data).hexdigest() != sha256:
+            raise ConanException(f"sha256 of {archive} {suite}/{name}{suffix} doesn't match its Release file")
+        stream = io.BytesIO(data)
+        if suffix == ".xz":
+            stream = lzma.LZMAFile(stream)
+        elif suffix == ".gz":
+            stream = gzip.GzipFile(fileobj=stream)
+        rows = []
+        provides = []
+        for p in iter_stanzas(io.TextIOWrapper(stream, encoding="utf-8")):
+            if "Filename" not in p or "SHA256" not in p:
+                continue
+            # Pre-Depends have to be installed as well, for the closure they are the same as Depends
+            depends = ", ".join(d for d in (p.get("Pre-Depends"), p.get("Depends")) if d)
+            rows.append((archive, suite, component, arch, p["Package"], p["Version"], p["Filename"], p["SHA256"],
+                         int(p.get("Size", 0)), depends, p.get("Multi-Arch", "no")))
+            for group in parse_depends(p.get("Provides", "")):
+                provides.extend((archive, suite, component, arch, name, p["Package"]) for name, _, _ in group)
+        with db:
+            for table in ("packages", "provides"):
+                db.execute(f"DELETE FROM {table} WHERE archive=? AND suite=? AND component=? AND arch=?",
+                           (archive, suite, component, arch))
+            db.executemany("INSERT INTO packages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            db.executemany("INSERT INTO provides VALUES (?, ?, ?, ?, ?, ?)", provides)
+            db.execute("INSERT OR REPLACE INTO indexes VALUES (?, ?, ?, ?, ?)",
+                       (archive, suite, component, arch, sha256))
+    with db:
+        db.execute("INSERT OR REPLACE INTO releases VALUES (?, ?, ?)", (archive, suite, time.time()))
+
+def lookup_deb(conanfile: ConanFile, archive: str, suites: List[str], package: str, version: Optional[str] = None,
+               arch: Optional[str] = None, components: Optional[List[str]] = None) -> DebPackage:
+    """
+    Finds a binary package in the Packages indexes of a debian archive, which are kept in a local
+    sqlite database next to the package cache and refreshed when needed.
+
+    :param archive: name of an archive in MIRRORS or the "user.debiantools:mirrors" conf, e.g. "ubuntu",
+                    or the url of an archive
+    :param suites: suites to search, e.g. ["bionic-updates", "bionic"]
+    :param version: full debian version like "237-3ubuntu10.57", the newest version if not given
+    :param arch: debian architecture, defaults to the one of the conanfile's settings
+    :param components: archive components to search, "main" if not given
+    """
+    arch = arch or translate_arch(conanfile)
+    components = components or ["main"]
+    with _index_lock:
+        db = _open_index(conanfile)
+        try:
+            for suite in suites:
+                _refresh_index(conanfile, db, archive, suite, components, arch)
+            rows = _query_packages(db, archive, suites, arch, package)
+        finally:
+            db.close()
+    if version is not None:
+        rows = [row for row in rows if row[1] == version]
+    if not rows:
+        raise ConanException(f"Package {package}{' ' + version if version else ''} ({arch}) not found "
+                             f"in {archive} {', '.join(suites)}")
+    return _deb_package(conanfile, archive, arch, _newest(rows))
+
+# row of the packages table: (package, version, filename, sha256, size, depends)
+_PackageRow = Tuple[str, str, str, str, int, str, str]
+
+def _query_packages(db: sqlite3.Connection, archive: str, suites: List[str], arch: str,
+                    package: str) -> List[_PackageRow]:
+    query = (f"SELECT package, version, filename, sha256, size, depends, multi_arch FROM packages WHERE package=? "
+             f"AND archive=? AND arch=? AND suite IN ({','.join('?' * len(suites))})")
+    return db.execute(query, (package, archive, arch, *suites)).fetchall()
+
+def _newest(rows: List[_PackageRow]) -> _PackageRow:
+    return max(rows, key=functools.cmp_to_key(lambda a, b: compare_versions(a[1], b[1])))
+
+def _deb_package(conanfile: ConanFile, archive: str, arch: str, row: _PackageRow) -> DebPackage:
+    package, version, filename, sha256, size, depends, _ = row
+    return DebPackage(package, version, arch, f"{_archive_mirrors(conanfile, archive)[0]}/{filename}", sha256, size,
+                      depends)
+
+def parse_depends(text: str) -> List[List[Tuple[str, Optional[str], Optional[str]]]]:
+    """
+    Parses a relationship field like "libc6 (>= 2.14), libbar2 | libbaz2" into its groups of
+    alternatives, each alternative as (package, operator, version). Architecture qualifiers are dropped.
+    """
+    groups = []
+    for group in text.split(","):
+        alternatives = []
+        for alternative in group.split("|"):
+            match = re.match(r"\s*([^\s(:\[]+)(?::[\w-]+)?\s*(?:\(\s*(<<|<=|>=|>>|=|<|>)\s*([^)\s]+)\s*\))?",
+                             alternative)
+            if match:
+                alternatives.append(match.groups())
+        if alternatives:
+            groups.append(alternatives)
+    return groups
+
+def _format_group(group: List[Tuple[str, Optional[str], Optional[str]]]) -> str:
+    return " | ".join(name + (f" ({operator} {version})" if operator else "") for name, operator, version in group)
+
+def _satisfies(version: str, operator: Optional[str], required: Optional[str]) -> bool:
+    if operator is None:
+        return True
+    result = compare_versions(version, required)
+    # '<' and '>' are the deprecated spellings of '<=' and '>='
+    return {"<<": result < 0, "<=": result <= 0, "<": result <= 0, "=": result == 0,
+            ">=": result >= 0, ">": result >= 0, ">>": result > 0}[operator]
+
+class DebClosure(NamedTuple):
+    packages: List[DebPackage]
+    # dependencies no package in the archive satisfies, like "libfoo1 (>= 2.0) (required by libbar1)"
+    unresolved: List[str]
+    # packages left to the build machine in a cross closure
+    foreign: List[str]
+
+def _resolve_closure(db: sqlite3.Connection, archive: str, suites: List[str], arch: str, packages: List[str],
+                     provided: List[str], cross: bool) -> Tuple[List[_PackageRow], List[str], List[str]]:
+    def candidates(name, operator, version):
+        rows = [row for row in _query_packages(db, archive, suites, arch, name) if _satisfies(row[1], operator, version)]
+        if not rows and operator is None:
+            # virtual packages, versioned provides are not considered
+            query = (f"SELECT DISTINCT package FROM provides WHERE name=? AND archive=? AND arch=? "
+                     f"AND suite IN ({','.join('?' * len(suites))})")
+            for (package,) in db.execute(query, (name, archive, arch, *suites)).fetchall():
+                rows.extend(_query_packages(db, archive, suites, arch, package))
+        return rows
+
+    selected = {}
+    queue = []
+    for spec in packages:
+        name, _, version = spec.partition("=")
+        rows = candidates(name, "=" if version else None, version or None)
+        if not rows:
+            raise ConanException(f"Package {spec} ({arch}) not found in {archive} {', '.join(suites)}")
+        selected[name] = _newest(rows)
+        queue.append(name)
+    unresolved = []
+    foreign = []
+    while queue:
+        row = selected[queue.pop(0)]
+        for text in row[5].split(","):
+            # like apt installing packages of another architecture, dependencies qualified with :any and packages
+            # that are Multi-Arch: foreign are satisfied by the build machine
+            if cross and ":any" in text:
+                continue
+            for group in parse_depends(text):
+                if any(name in provided or name in foreign
+                       or (name in selected and _satisfies(selected[name][1], operator, version))
+                       for name, operator, version in group):
+                    continue
+                # like apt, the first alternative that can be installed wins
+                for name, operator, version in group:
+                    rows = [] if name in selected else candidates(name, operator, version)
+                    if rows:
+                        choice = _newest(rows)
+                        if cross and choice[6] == "foreign":
+                            foreign.append(choice[0])
+                        elif choice[0] not in selected:
+                            selected[choice[0]] = choice
+                            queue.append(choice[0])
+                        break
+                else:
+                    unresolved.append(f"{_format_group(group)} (required by {row[0]})")
+    return list(selected.values()), unresolved, foreign
+
+def dependency_closure(conanfile: ConanFile, archive: str, suites: List[str], packages: List[str],
+                       provided: Optional[List[str]] = None, arch: Optional[str] = None,
+                       components: Optional[List[str]] = None, cross: bool = False) -> DebClosure:
+    """
+    Resolves the packages and all their transitive Depends and Pre-Depends through the Packages indexes of
+    an archive, see lookup_deb(). Closures are cached in the index database until the indexes change.
+
+    :param packages: package names, optionally with a version like "libsystemd0=237-3ubuntu10.57"
+    :param provided: packages that are available without being part of the closure,
+                     BASE_SYSTEM_PACKAGES if not given
+    :param cross: resolve like apt installs packages of a foreign architecture, leaving dependencies on programs
+                  (Multi-Arch: foreign packages and ones qualified with :any) to the build machine
+    """
+    arch = arch or translate_arch(conanfile)
+    components = components or ["main"]
+    provided = BASE_SYSTEM_PACKAGES if provided is None else provided
+    with _index_lock:
+        db = _open_index(conanfile)
+        try:
+            for suite in suites:
+                _refresh_index(conanfile, db, archive, suite, components, arch)
+            shas = db.execute(f"SELECT sha256 FROM indexes WHERE archive=? AND arch=? "
+                              f"AND suite IN ({','.join('?' * len(suites))}) ORDER BY suite, component",
+                              (archive, arch, *suites)).fetchall()
+            key = hashlib.sha256(json.dumps([archive, suites, arch, components, packages, sorted(provided), cross,
+                                             shas]).encode()).hexdigest()
+            cached = db.execute("SELECT value FROM closures WHERE key=?", (key,)).fetchone()
+            if cached:
+                rows, unresolved, foreign = json.loads(cached[0])
+            else:
+                rows, unresolved, foreign = _resolve_closure(db, archive, suites, arch, packages, provided, cross)
+                with db:
+                    db.execute("INSERT OR REPLACE INTO closures VALUES (?, ?)",
+                               (key, json.dumps([rows, unresolved, foreign])))
+        finally:
+            db.close()
+    return DebClosure([_deb_package(conanfile, archive, arch, tuple(row)) for row in rows], unresolved, foreign)
+
+def unresolved_dependencies(conanfile: ConanFile, provided: Optional[List[str]] = None) -> List[str]:
+    """
+    Returns the Depends and Pre-Depends of the library packages extracted into the build folder
+    (the ones with a shlibs file, since only their dependencies end up on link lines) that are neither
+    satisfied by the extracted packages themselves, nor by provided or BASE_SYSTEM_PACKAGES.
+    This works without the archive's indexes, so version constraints are not checked.
+
+    :param provided: debian packages behind the recipe's requirements, e.g. ["libudev1"]
+    """
+    debs = [deb for record in _load_manifest(conanfile.build_folder).values() for deb in record.get("debs", [])]
+    available = set(BASE_SYSTEM_PACKAGES) | set(provided or [])
+    for deb in debs:
+        control = deb.get("control", {})
+        available.add(control.get("Package"))
+        available.update(name for group in parse_depends(control.get("Provides", "")) for name, _, _ in group)
+    unresolved = []
+    for deb in debs:
+        if not deb.get("shlibs"):
+            continue
+        control = deb["control"]
+        for group in parse_depends(", ".join(d for d in (control.get("Pre-Depends"), control.get("Depends")) if d)):
+            if not any(name in available for name, _, _ in group):
+                if _format_group(group) not in unresolved:
+                    unresolved.append(_format_group(group))
+    return unresolved
+
+SYSROOTS_FOLDER = "sysroots"
+# bumped whenever the content of a sysroot changes, older ones are not reused
+SYSROOT_VERSION = 1
+# seconds since its last use before a sysroot can be evicted
+SYSROOT_MIN_AGE = 24 * 3600
+# packages that the cross toolchain's own sysroot provides
+TOOLCHAIN_PACKAGES = BASE_SYSTEM_PACKAGES + ["libc6-dev", "linux-libc-dev"]
+
+class Sysroot(NamedTuple):
+    folder: str
+    # folders with the pkg-config files of the packages
+    pkg_config_path: List[str]
+    # folders with the shared libraries, e.g. for -rpath-link
+    libdirs: List[str]
+    packages: List[DebPackage]
+
+def _relocate_pkg_config(path: str, sysroot: str) -> None:
+    """
+    Points the absolute paths of a pkg-config file extracted into sysroot into it, e.g. "prefix=/usr" to
+    "prefix=<sysroot>/usr" and "-I/usr/include/foo" to "-I<sysroot>/usr/include/foo".
+    """
+    with open(path) as f:
+        lines = f.read().splitlines(True)
+    for i, line in enumerate(lines):
+        if re.match(r"[\w.]+\s*=\s*/", line):
+            name, _, value = line.partition("=")
+            lines[i] = f"{name}={sysroot}{value.lstrip()}"
+        elif re.match(r"[\w.]+\s*:", line):
+            lines[i] = re.sub(r"(-[IL])/", lambda match: f"{match.group(1)}{sysroot}/", line)
+    # the file can be a hardlink into the extraction cache
+    temporary = path + ".tmp"
+    with open(temporary, "w") as f:
+        f.writelines(lines)
+    shutil.copymode(path, temporary)
+    os.replace(temporary, path)
+
+def cross_sysroot(conanfile: ConanFile, archive: str, suites: List[str], packages: List[str],
+                  provided: Optional[List[str]] = None, components: Optional[List[str]] = None) -> Sysroot:
+    """
+    Makes a sysroot to cross compile against debian packages instead of installing them with apt: the packages
+    and their dependencies for the arch of conanfile are resolved like dependency_closure(cross=True) does, and
+    their libraries, headers and pkg-config files are extracted into a folder in the cache named by the sha256 of
+    the resolved packages, so later builds with the same packages reuse it right away. If all packages are pinned
+    to a version, the sysroot made for them is reused without fetching the indexes, with the dependencies that were
+    resolved when it was made. Sysroots are evicted like the extracted packages once unused for SYSROOT_MIN_AGE.
+    The pkg-config files are rewritten to point into the sysroot, so they can be used next to the ones of the
+    conan requirements without setting PKG_CONFIG_SYSROOT_DIR.
+
+    :param packages: package names, optionally with a version like "libglib2.0-dev=2.56.4-0ubuntu0.18.04.9"
+    :param provided: packages that are not needed in the sysroot, TOOLCHAIN_PACKAGES if not given
+    """
+    provided = TOOLCHAIN_PACKAGES if provided is None else provided
+    components = components or ["main"]
+    triplet = triplet_name(conanfile)
+    root = os.path.join(_cache_root(conanfile), SYSROOTS_FOLDER)
+    pinned = all("=" in package for package in packages)
+    if pinned:
+        # with every package pinned, the sysroot made for them before is used without looking at the indexes
+        request = hashlib.sha256(json.dumps([SYSROOT_VERSION, triplet, archive, suites, components, sorted(packages),
+                                             sorted(provided)]).encode()).hexdigest()
+        pin = os.path.join(root, request[:32] + ".pin")
+        try:
+            with open(pin) as f:
+                name = f.read().strip()
+            with open(os.path.join(root, name + ".json")) as f:
+                debs = [DebPackage(*deb) for deb in json.load(f)["packages"]]
+            if os.path.isdir(os.path.join(root, name)):
+                return _use_sysroot(conanfile, os.path.join(root, name), triplet, debs)
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+    closure = dependency_closure(conanfile, archive, suites, packages, provided, components=components, cross=True)
+    for dependency in closure.unresolved:
+        conanfile.output.warning(f"debiantools: no package in {archive} for sysroot dependency {dependency}")
+    debs = sorted(closure.packages)
+    key = hashlib.sha256(json.dumps([SYSROOT_VERSION, triplet, [(deb.package, deb.version, deb.sha256)
+                                                                for deb in debs]]).encode()).hexdigest()
+    folder = os.path.join(root, key[:32])
+    if os.path.isdir(folder):
+        sysroot = _use_sysroot(conanfile, folder, triplet, debs)
+    else:
+        os.makedirs(root, exist_ok=True)
+        lock = _cache_lock(root, key[:32])
+        lock.acquire()
+        try:
+            # another build made it while waiting for the lock
+            if not os.path.isdir(folder):
+                _make_sysroot(conanfile, folder, triplet, debs)
+        finally:
+            lock.release()
+        conanfile.output.info(f"debiantools: made sysroot of {len(debs)} debian packages in {folder}")
+        sysroot = _sysroot(folder, triplet, debs)
+        cache = _cache_folder(conanfile)
+        if cache:
+            _evict_cache(conanfile, cache, keep=key[:32])
+    if pinned:
+        # concurrent builds with the same packages write the same pin, each through a file of its own
+        fd, temporary = tempfile.mkstemp(prefix="tmp-", suffix=".pin", dir=root)
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(key[:32])
+            os.replace(temporary, pin)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+    return sysroot
+
+def _sysroot(folder: str, triplet: str, debs: List[DebPackage]) -> Sysroot:
+    pkg_config_path = [os.path.join(folder, "usr", "lib", triplet, "pkgconfig"),
+                       os.path.join(folder, "usr", "lib", "pkgconfig"),
+                       os.path.join(folder, "usr", "share", "pkgconfig")]
+    libdirs = [os.path.join(folder, "lib", triplet), os.path.join(folder, "usr", "lib", triplet)]
+    return Sysroot(folder, pkg_config_path, libdirs, debs)
+
+def _use_sysroot(conanfile: ConanFile, folder: str, triplet: str, debs: List[DebPackage]) -> Sysroot:
+    # the modification time orders the sysroots for eviction
+    os.utime(folder)
+    conanfile.output.info(f"debiantools: using sysroot of {len(debs)} debian packages in {folder}")
+    return _sysroot(folder, triplet, debs)
+
+def _make_sysroot(conanfile: ConanFile, folder: str, triplet: str, debs: List[DebPackage]) -> None:
+    with _traced(conanfile, "cross_sysroot", packages=len(debs)) as trace:
+        staging = tempfile.mkdtemp(prefix="tmp-", dir=os.path.dirname(folder))
+        try:
+            files, _, _ = _download_extract_debs(conanfile, [(deb.url, deb.sha256) for deb in debs], [
+                f"lib/{triplet}/*",
+                f"usr/lib/{triplet}/*",
+                "usr/lib/pkgconfig/*",
+                "usr/share/pkgconfig/*",
+                "usr/include/*"], None, staging)
+            for file in files:
+                if file.endswith(".pc") and not os.path.islink(os.path.join(staging, file)):
+                    _relocate_pkg_config(os.path.join(staging, file), folder)
+            # the size for the eviction and the packages for requests that skip the indexes
+            with open(folder + ".json", "w") as f:
+                json.dump({"size": _tree_size(staging), "packages": debs}, f)
+            os.rename(staging, folder)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        if trace is not None:
+            trace["files"] = len(files)
+            trace["bytes"] = _files_size(folder, files)
+
+LIBRARY_INDEX = "debiantools_libraries.json"
+
+# e_machine of the ELF header for each conan arch
+ELF_MACHINES = {"x86": 3, "x86_64": 62, "armv7": 40, "armv7hf": 40, "armv8": 183, "ppc32": 20, "ppc64le": 21,
+                "s390x": 22, "mips": 8}
+# sonames of the C library that are linked through system_libs, all others must come from a requirement
+SYSTEM_SONAMES = {"libm.so.6": "m", "libdl.so.2": "dl", "libpthread.so.0": "pthread", "librt.so.1": "rt"}
+# sonames that every toolchain links implicitly
+IMPLICIT_SONAMES = ["libc.so.6", "libgcc_s.so.1", "libstdc++.so.6", "ld-linux.so.2", "ld-linux-x86-64.so.2",
+                    "ld-linux-aarch64.so.1", "ld-linux-armhf.so.3"]
+
+class ElfInfo(NamedTuple):
+    machine: int
+    soname: Optional[str]
+    needed: List[str]
+    runpath: Optional[str]
+    # defined global and weak symbols with default or protected visibility
+    symbols: List[str]
+    # global symbols the library needs from the libraries it links to
+    undefined: List[str]
+
+def _read_elf_sections(f: BinaryIO) -> Optional[Tuple[bool, str, int, list]]:
+    """
+    Reads the header and section headers of an ELF shared object.
+
+    :return: (is64, struct endianness, e_machine, section headers), None if f is not an ELF shared object
+    """
+    ident = f.read(16)
+    if len(ident) < 16 or ident[:4] != b"\x7fELF" or ident[4] not in (1, 2) or ident[5] not in (1, 2):
+        return None
+    is64 = ident[4] == 2
+    endian = "<" if ident[5] == 1 else ">"
+    header = f.read(48 if is64 else 36)
+    if is64:
+        e_type, e_machine, _, _, _, e_shoff, _, _, _, _, e_shentsize, e_shnum, _ = struct.unpack(
+            endian + "HHIQQQIHHHHHH", header)
+    else:
+        e_type, e_machine, _, _, _, e_shoff, _, _, _, _, e_shentsize, e_shnum, _ = struct.unpack(
+            endian + "HHIIIIIHHHHHH", header)
+    # ET_DYN
+    if e_type != 3:
+        return None
+    section_format = endian + ("IIQQQQIIQQ" if is64 else "IIIIIIIIII")
+    f.seek(e_shoff)
+    sections = [struct.unpack(section_format, f.read(e_shentsize)[:struct.calcsize(section_format)])
+                for _ in range(e_shnum)]
+    return is64, endian, e_machine, sections
+
+def _read_section(f: BinaryIO, section: tuple) -> bytes:
+    # sh_offset, sh_size
+    f.seek(section[4])
+    return f.read(section[5])
+
+def _string(strings: bytes, offset: int) -> str:
+    return strings[offset:strings.index(b"\0", offset)].decode("utf-8", errors="replace")
+
+def read_elf(path: str) -> Optional[ElfInfo]:
+    """
+    Reads the dynamic section and the exported and undefined symbols of an ELF shared library,
+    without depending on binutils of the target architecture.
+
+    :return: None if path is not an ELF shared object
+    """
+    with open(path, "rb") as f:
+        elf = _read_elf_sections(f)
+        if elf is None:
+            return None
+        is64, endian, e_machine, sections = elf
+        soname, needed, runpath, symbols, undefined = None, [], None, set(), set()
+        for section in sections:
+            sh_type, sh_link = section[1], section[6]
+            # SHT_DYNAMIC
+            if sh_type == 6:
+                strings = _read_section(f, sections[sh_link])
+                entry_format = endian + ("qQ" if is64 else "iI")
+                for tag, value in struct.iter_unpack(entry_format, _read_section(f, section)):
+                    # DT_NULL, DT_NEEDED, DT_SONAME, DT_RPATH, DT_RUNPATH
+                    if tag == 0:
+                        break
+                    if tag == 1:
+                        needed.append(_string(strings, value))
+                    elif tag == 14:
+                        soname = _string(strings, value)
+                    elif tag in (15, 29):
+                        runpath = _string(strings, value)
+            # SHT_DYNSYM
+            elif sh_type == 11:
+                names = _read_section(f, sections[sh_link])
+                symbol_format = endian + ("IBBHQQ" if is64 else "IIIBBH")
+                for symbol in struct.iter_unpack(symbol_format, _read_section(f, section)):
+                    info, other, shndx = symbol[1:4] if is64 else symbol[3:6]
+                    if not symbol[0]:
+                        continue
+                    # defined outside SHN_ABS (which holds the version names), STB_GLOBAL/STB_WEAK/STB_GNU_UNIQUE,
+                    # STV_DEFAULT/STV_PROTECTED
+                    if shndx not in (0, 0xfff1) and info >> 4 in (1, 2, 10) and other & 3 in (0, 3):
+                        symbols.add(_string(names, symbol[0]))
+                    # undefined STB_GLOBAL, undefined weak symbols are optional
+                    elif shndx == 0 and info >> 4 == 1:
+                        undefined.add(_string(names, symbol[0]))
+        return ElfInfo(e_machine, soname, needed, runpath, sorted(symbols), sorted(undefined))
+
+def _set_runpath_in_place(path: str, runpath: str, write: bool = True) -> bool:
+    """
+    Overwrites the DT_RUNPATH (or DT_RPATH) string of an ELF shared object with runpath, which is only possible if
+    the object already has one that is at least as long and that doesn't share its bytes with other strings.
+
+    :param write: only check whether it is possible if False
+    :return: False if the runpath could not be set this way
+    """
+    with open(path, "r+b" if write else "rb") as f:
+        elf = _read_elf_sections(f)
+        if elf is None:
+            return False
+        is64, endian, _, sections = elf
+        dynamic = next((section for section in sections if section[1] == 6), None)
+        if dynamic is None:
+            return False
+        strtab = sections[dynamic[6]]
+        strings = _read_section(f, strtab)
+        entry_format = endian + ("qQ" if is64 else "iI")
+        entries = []
+        for tag, value in struct.iter_unpack(entry_format, _read_section(f, dynamic)):
+            if tag == 0:
+                break
+            entries.append((tag, value))
+        index = next((i for i, (tag, _) in enumerate(entries) if tag in (15, 29)), None)
+        if index is None:
+            return False
+        start = entries[index][1]
+        end = strings.index(b"\0", start)
+        if len(runpath.encode()) > end - start:
+            return False
+        # the linker merges strings that are the tail of another one
+        offsets = [value for i, (tag, value) in enumerate(entries) if tag in (1, 14, 15, 29) and i != index]
+        for section in sections:
+            # SHT_DYNSYM
+            if section[1] == 11 and section[6] == dynamic[6]:
+                symbol_format = endian + ("IBBHQQ" if is64 else "IIIBBH")
+                offsets.extend(symbol[0] for symbol in struct.iter_unpack(symbol_format, _read_section(f, section)))
+        if any(start < offset <= end for offset in offsets):
+            return False
+        if not write:
+            return True
+        f.seek(strtab[4] + start)
+        f.write(runpath.encode().ljust(end - start, b"\0"))
+        # DT_RPATH is searched before LD_LIBRARY_PATH, make it a DT_RUNPATH like the linker does today
+        f.seek(dynamic[4] + index * struct.calcsize(entry_format))
+        f.write(struct.pack(endian + ("q" if is64 else "i"), 29))
+    return True
+
+def _resolve_link(root: str, path: str) -> Optional[str]:
+    """
+    Follows the symlink at path (relative to root) to a file inside root. Absolute targets, which point into
+    the file system the package was made for, are looked up next to the link.
+    """
+    for _ in range(40):
+        full = os.path.join(root, path)
+        if not os.path.islink(full):
+            return path if os.path.isfile(full) else None
+        target = os.readlink(full)
+        if os.path.isabs(target):
+            target = os.path.basename(target)
+        path = os.path.normpath(os.path.join(os.path.dirname(path), target))
+        if path.startswith(".."):
+            return None
+    return None
+
+def _make_writable(path: str) -> None:
+    # packaged files can be hardlinks into the extraction cache, which must not change, and are read-only like it
+    if os.stat(path).st_nlink > 1:
+        temporary = path + ".tmp"
+        shutil.copy2(path, temporary)
+        os.replace(temporary, path)
+    os.chmod(path, os.stat(path).st_mode | 0o200)
+
+def _set_runpath(conanfile: ConanFile, path: str, runpath: str) -> bool:
+    """
+    Sets the RUNPATH of an ELF shared object, in place if it already has one that is long enough,
+    otherwise with patchelf if it is installed.
+
+    :return: False if neither was possible
+    """
+    if _set_runpath_in_place(path, runpath, write=False):
+        _make_writable(path)
+        return _set_runpath_in_place(path, runpath)
+    patchelf = shutil.which("patchelf")
+    if patchelf is None:
+        conanfile.output.warning(f"debiantools: can't set the RUNPATH of {os.path.basename(path)} to '{runpath}' "
+                                 f"without patchelf")
+        return False
+    _make_writable(path)
+    result = subprocess.run([patchelf, "--set-rpath", runpath, path], stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT)
+    if result.returncode != 0:
+        raise ConanException(f"patchelf failed to set the RUNPATH of {path}: "
+                             f"{result.stdout.decode(errors='replace').strip()}")
+    return True
+
+def write_library_index(conanfile: ConanFile, folder: str = "lib", origin_runpath: bool = False) -> None:
+    """
+    Scans the shared libraries below folder of the package once and writes their SONAME, NEEDED, RUNPATH and
+    symbols to an index in the package, which library_info() reads in package_info().
+    Raises if a library was built for a different architecture than the package.
+
+    :param origin_runpath: set the RUNPATH of every library that needs other libraries of the package to the
+                           folders of these relative to $ORIGIN, so the dynamic loader finds them without
+                           LD_LIBRARY_PATH, e.g. "$ORIGIN/pulseaudio" for a library in a subfolder
+    """
+    root = conanfile.package_folder
+    expected = ELF_MACHINES.get(str(conanfile.settings.arch))
+    libraries = {}
+    links = {}
+    for dirpath, dirs, files in os.walk(os.path.join(root, folder)):
+        for name in sorted(dirs + files):
+            if not re.search(r"\.so(\.[0-9.]+)?$", name):
+                continue
+            path = os.path.relpath(os.path.join(dirpath, name), root).replace(os.sep, "/")
+            if os.path.islink(os.path.join(root, path)):
+                target = _resolve_link(root, path)
+                if target is not None:
+                    links[path] = target.replace(os.sep, "/")
+                continue
+            info = read_elf(os.path.join(root, path))
+            if info is None:
+                continue
+            if expected is not None and info.machine != expected:
+                raise ConanException(f"{path} is built for ELF machine {info.machine}, "
+                                     f"but the package is for {conanfile.settings.arch}")
+            libraries[path] = info._asdict()
+    if origin_runpath:
+        by_soname = {info["soname"]: path for path, info in libraries.items() if info["soname"]}
+        for path, info in libraries.items():
+            folders = []
+            for soname in info["needed"]:
+                if soname in by_soname:
+                    relative = os.path.relpath(os.path.dirname(by_soname[soname]), os.path.dirname(path))
+                    relative = "$ORIGIN" if relative == "." else "$ORIGIN/" + relative.replace(os.sep, "/")
+                    if relative not in folders:
+                        folders.append(relative)
+            runpath = ":".join(folders)
+            if folders and info["runpath"] != runpath and _set_runpath(conanfile, os.path.join(root, path), runpath):
+                info["runpath"] = runpath
+    with open(os.path.join(root, LIBRARY_INDEX), "w") as f:
+        json.dump({"package": f"{conanfile.name}/{conanfile.version}", "libraries": libraries, "links": links},
+                  f, indent=1, sort_keys=True)
+
+def copy_runtime_libraries(conanfile: ConanFile, src: Union[str, os.PathLike], dst: Union[str, os.PathLike]) -> None:
+    """
+    Like copy_linked(), but only puts what the dynamic loader opens into dst: the shared libraries below src that
+    have a SONAME and the symlinks named like it, without development links, static archives and other files.
+    """
+    src = str(src)
+    includes = []
+    for root, dirs, files in os.walk(src):
+        for name in files:
+            if os.path.islink(os.path.join(root, name)):
+                continue
+            info = read_elf(os.path.join(root, name))
+            if info is None or info.soname is None:
+                continue
+            for file in {name, info.soname}:
+                if os.path.lexists(os.path.join(root, file)):
+                    path = os.path.relpath(os.path.join(root, file), src).replace(os.sep, "/")
+                    # match the path literally
+                    includes.append(re.sub(r"([\[*?])", r"[\1]", path))
+    with _traced(conanfile, "copy_runtime_libraries", src=src) as trace:
+        files = link_tree(src, str(dst), includes) if includes else []
+        if trace is not None:
+            trace["files"] = len(files)
+            trace["bytes"] = _files_size(str(dst), files)
+    if trace is not None:
+        conanfile.output.info(f"debiantools: packaged {trace['files']} runtime libraries "
+                              f"({trace['bytes'] / 1e6:.1f} MB) in {trace['seconds']:.2f}s")
+
+def _runpath_folders(libraries: Dict[str, dict]) -> Set[str]:
+    """
+    Returns the folders of the package whose libraries are all needed by libraries outside of them, which find
+    them through their RUNPATH relative to $ORIGIN, as set by write_library_index(origin_runpath=True).
+    Neither the dynamic loader nor the linker, which searches the RUNPATH of a library for its dependencies,
+    needs these folders as libdirs.
+    """
+    by_soname = {info["soname"]: path for path, info in libraries.items() if info["soname"]}
+    needed_by = {path: [] for path in libraries}
+    for path, info in libraries.items():
+        for soname in info["needed"]:
+            if by_soname.get(soname, path) != path:
+                needed_by[by_soname[soname]].append(path)
+
+    def searched(path):
+        # folders that the RUNPATH of the library at path points to within the package
+        folders = set()
+        for entry in (libraries[path].get("runpath") or "").split(":"):
+            for origin in ("$ORIGIN", "${ORIGIN}"):
+                if entry == origin or entry.startswith(origin + "/"):
+                    folder = os.path.join(os.path.dirname(path), entry[len(origin) + 1:])
+                    folders.add(os.path.normpath(folder).replace(os.sep, "/"))
+        return folders
+
+    reached = {}
+    outside = set()
+    for path in libraries:
+        folder = os.path.dirname(path)
+        found = bool(needed_by[path]) and all(folder in searched(needer) for needer in needed_by[path])
+        reached[folder] = reached.get(folder, True) and found
+        if any(os.path.dirname(needer) != folder for needer in needed_by[path]):
+            outside.add(folder)
+    return {folder for folder, found in reached.items() if found and folder in outside}
+
+class LibraryInfo(NamedTuple):
+    libs: List[str]
+    libdirs: List[str]
+    system_libs: List[str]
+    # libs of the package each lib links to
+    requires: Dict[str, List[str]]
+    # sonames needed by the libs that neither the package nor the system provides
+    unresolved: List[str]
+
+def library_info(conanfile: ConanFile, libs: Optional[List[str]] = None) -> LibraryInfo:
+    """
+    Derives the link information of a package from the index written by write_library_index().
+    A library can be linked if the package has a "lib<name>.so" file or symlink for it.
+
+    :param libs: libraries to link, extended by the libraries of the package they need.
+                 All libraries that can be linked if not given.
+    :return: libs ordered so that every library comes before the ones it needs. Libraries that the others find
+             through their RUNPATH are left out, together with their folder, unless they are in libs.
+    """
+    with open(os.path.join(conanfile.package_folder, LIBRARY_INDEX)) as f:
+        index = json.load(f)
+    libraries = index["libraries"]
+    # lib name -> path of the library file
+    linkable = {}
+    for path in sorted(set(libraries) | set(index["links"])):
+        target = index["links"].get(path, path)
+        match = re.fullmatch(r"lib(.+)\.so", os.path.basename(path))
+        if match and target in libraries:
+            linkable.setdefault(match.group(1), (os.path.dirname(path), target))
+    by_soname = {info["soname"]: name for name, (_, target) in linkable.items()
+                 for info in [libraries[target]] if info["soname"]}
+    provided = {info["soname"] for info in libraries.values()} | {os.path.basename(p) for p in libraries}
+
+    requires = {}
+    pending = list(libs if libs is not None else linkable)
+    while pending:
+        name = pending.pop(0)
+        if name in requires:
+            continue
+        if name not in linkable:
+            raise ConanException(f"{conanfile.name} has no library {name} to link")
+        requires[name] = [by_soname[soname] for soname in libraries[linkable[name][1]]["needed"]
+                          if soname in by_soname and by_soname[soname] != name]
+        pending.extend(requires[name])
+
+    # depth first, every library ends up before the ones it needs
+    ordered = []
+
+    def visit(name, visited):
+        if name not in visited:
+            visited.add(name)
+            for required in requires[name]:
+                visit(required, visited)
+            ordered.insert(0, name)
+    visited = set()
+    for name in requires:
+        visit(name, visited)
+
+    needed = [soname for name in ordered for soname in libraries[linkable[name][1]]["needed"]]
+    system_libs = []
+    unresolved = []
+    for soname in needed:
+        if soname in SYSTEM_SONAMES:
+            if SYSTEM_SONAMES[soname] not in system_libs:
+                system_libs.append(SYSTEM_SONAMES[soname])
+        elif soname not in provided and soname not in IMPLICIT_SONAMES and soname not in unresolved:
+            unresolved.append(soname)
+    # e.g. libpulsecommon in lib/pulseaudio, which libpulse finds through its RUNPATH
+    runpath_folders = _runpath_folders(libraries)
+    ordered = [name for name in ordered
+               if linkable[name][0] not in runpath_folders or (libs is not None and name in libs)]
+    requires = {name: [required for required in requires[name] if required in ordered] for name in ordered}
+    libdirs = []
+    for name in ordered:
+        if linkable[name][0] not in libdirs:
+            libdirs.append(linkable[name][0])
+    return LibraryInfo(ordered, libdirs, system_libs, requires, unresolved)
+
+def library_folders(conanfile: ConanFile) -> List[str]:
+    """
+    Returns the folders of the package with shared libraries in the index written by write_library_index(),
+    e.g. as libdirs of a package that only contains runtime libraries.
+    Folders that the libraries find through their RUNPATH are left out.
+    """
+    with open(os.path.join(conanfile.package_folder, LIBRARY_INDEX)) as f:
+        index = json.load(f)
+    return sorted({os.path.dirname(path) for path in index["libraries"]} - _runpath_folders(index["libraries"]))
+
+SYMBOL_INDEX_FILE = "symbols.sqlite"
+# bumped whenever the schema changes, older databases are recreated
+SYMBOL_INDEX_VERSION = 1
+SYMBOL_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS packages (folder TEXT PRIMARY KEY, package TEXT, sha256 TEXT);
+CREATE TABLE IF NOT EXISTS libraries (id INTEGER PRIMARY KEY, folder TEXT, path TEXT, soname TEXT);
+CREATE INDEX IF NOT EXISTS libraries_folder ON libraries (folder);
+CREATE TABLE IF NOT EXISTS symbols (name TEXT, library INTEGER, PRIMARY KEY (name, library)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS symbols_library ON symbols (library);
+"""
+
+class SymbolProvider(NamedTuple):
+    symbol: str
+    # name/version of the package
+    package: str
+    # library file, relative to the package folder
+    library: str
+    soname: Optional[str]
+    folder: str
+
+def _open_symbol_index(conanfile: ConanFile) -> sqlite3.Connection:
+    db = sqlite3.connect(os.path.join(_cache_root(conanfile), SYMBOL_INDEX_FILE), timeout=60)
+    if db.execute("PRAGMA user_version").fetchone()[0] != SYMBOL_INDEX_VERSION:
+        with db:
+            for (table,) in db.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall():
+                db.execute(f"DROP TABLE {table}")
+        db.execute(f"PRAGMA user_version={SYMBOL_INDEX_VERSION}")
+    db.executescript(SYMBOL_INDEX_SCHEMA)
+    return db
+
+def _remove_symbol_package(db: sqlite3.Connection, folder: str) -> None:
+    db.execute("DELETE FROM symbols WHERE library IN (SELECT id FROM libraries WHERE folder = ?)", (folder,))
+    db.execute("DELETE FROM libraries WHERE folder = ?", (folder,))
+    db.execute("DELETE FROM packages WHERE folder = ?", (folder,))
+
+def update_symbol_index(conanfile: ConanFile, folders: List[str]) -> int:
+    """
+    Adds the exported symbols of the packages in folders to the symbol index in the cache folder. Only packages
+    with a library index written by write_library_index() are indexed, and only again when their library index
+    changed, i.e. for a new package revision. Packages whose folder no longer exists are removed.
+
+    :return: number of packages that were (re)indexed
+    """
+    indexed = 0
+    db = _open_symbol_index(conanfile)
+    try:
+        with db:
+            for (folder,) in db.execute("SELECT folder FROM packages").fetchall():
+                if not os.path.isfile(os.path.join(folder, LIBRARY_INDEX)):
+                    _remove_symbol_package(db, folder)
+            for folder in folders:
+                folder = os.path.abspath(folder)
+                try:
+                    with open(os.path.join(folder, LIBRARY_INDEX), "rb") as f:
+                        content = f.read()
+                except FileNotFoundError:
+                    continue
+                sha256 = hashlib.sha256(content).hexdigest()
+                row = db.execute("SELECT sha256 FROM packages WHERE folder = ?", (folder,)).fetchone()
+                if row and row[0] == sha256:
+                    continue
+                index = json.loads(content)
+                _remove_symbol_package(db, folder)
+                db.execute("INSERT INTO packages VALUES (?, ?, ?)",
+                           (folder, index.get("package", os.path.basename(folder)), sha256))
+                for path, info in index["libraries"].items():
+                    symbols = info["symbols"]
+                    # library indexes written before the symbol names were recorded only hold their number
+                    if not isinstance(symbols, list):
+                        symbols = read_elf(os.path.join(folder, path)).symbols
+                    library = db.execute("INSERT INTO libraries (folder, path, soname) VALUES (?, ?, ?)",
+                                         (folder, path, info["soname"])).lastrowid
+                    db.executemany("INSERT OR IGNORE INTO symbols VALUES (?, ?)",
+                                   ((name, library) for name in symbols))
+                indexed += 1
+    finally:
+        db.close()
+    return indexed
+
+def find_symbols(conanfile: ConanFile, symbol: str, prefix: bool = False) -> List[SymbolProvider]:
+    """
+    Looks up the libraries in the symbol index that export symbol, or all symbols starting with it if prefix is set.
+    """
+    query = ("SELECT symbols.name, packages.package, libraries.path, libraries.soname, libraries.folder "
+             "FROM symbols JOIN libraries ON symbols.library = libraries.id "
+             "JOIN packages ON libraries.folder = packages.folder ")
+    db = _open_symbol_index(conanfile)
+    try:
+        if not prefix:
+            rows = db.execute(query + "WHERE symbols.name = ? ORDER BY 2, 3", (symbol,))
+        elif symbol:
+            # a range on the primary key instead of LIKE, which sqlite can't answer from the index
+            rows = db.execute(query + "WHERE symbols.name >= ? AND symbols.name < ? ORDER BY 1, 2, 3",
+                              (symbol, symbol[:-1] + chr(ord(symbol[-1]) + 1)))
+        else:
+            rows = db.execute(query + "ORDER BY 1, 2, 3")
+        return [SymbolProvider(*row) for row in rows.fetchall()]
+    finally:
+        db.close()
+
+def symbol_providers(conanfile: ConanFile, symbols: List[str]) -> Dict[str, List[SymbolProvider]]:
+    """
+    Looks up the libraries in the symbol index that export each of symbols, e.g. the undefined symbols of a
+    library that fails to link (see read_elf()). Symbols that no indexed package exports map to an empty list.
+    """
+    providers = {symbol: [] for symbol in symbols}
+    db = _open_symbol_index(conanfile)
+    try:
+        db.execute("CREATE TEMP TABLE wanted (name TEXT PRIMARY KEY)")
+        db.executemany("INSERT OR IGNORE INTO wanted VALUES (?)", ((symbol,) for symbol in symbols))
+        for row in db.execute("SELECT symbols.name, packages.package, libraries.path, libraries.soname, "
+                              "libraries.folder FROM wanted JOIN symbols ON symbols.name = wanted.name "
+                              "JOIN libraries ON symbols.library = libraries.id "
+                              "JOIN packages ON libraries.folder = packages.folder ORDER BY 1, 2, 3"):
+            providers[row[0]].append(SymbolProvider(*row))
+    finally:
+        db.close()
+    return providers
 
 def triplet_name(conanfile: ConanFile, force_linux: bool=False) -> str:
     if force_linux:
@@ -154,3 +2344,55 @@ def copy_cleaned_no_prefix(source: List[str], prefix_remove: str, dest: List[str
         entry = remove_prefix(remove_prefix(e, prefix_remove), "/")
         if len(entry) > 0 and not entry in dest:
             dest.append(entry)
+
+if __name__ == "__main__":
+    # Looks up the url and sha256 to pin in a recipe, e.g.
+    # python debiantools.py lookup ubuntu bionic-updates,bionic libudev1 --version 237-3ubuntu10.57 --arch arm64
+    # or the packages that export symbols, e.g. the ones a library that fails to link needs
+    # python debiantools.py symbols --undefined build/src/.libs/libostree-1.so.1
+    import argparse
+    import glob
+    from types import SimpleNamespace
+    from conan.api.conan_api import ConanAPI
+    from conan.api.output import ConanOutput
+
+    parser = argparse.ArgumentParser(description="Look up debian packages and the symbols of packaged libraries")
+    commands = parser.add_subparsers(dest="command", required=True)
+    lookup = commands.add_parser("lookup", help="look up debian packages in the Packages indexes of an archive")
+    lookup.add_argument("archive", help="archive name like ubuntu, ubuntu-ports or debian, or the url of an archive")
+    lookup.add_argument("suites", help="comma separated suites, e.g. bionic-updates,bionic")
+    lookup.add_argument("packages", nargs="+")
+    lookup.add_argument("--version", help="full debian version, the newest if not given")
+    lookup.add_argument("--arch", default="amd64", help="debian architecture")
+    lookup.add_argument("--components", default="main", help="comma separated archive components")
+    symbols = commands.add_parser("symbols", help="find the packages that export symbols")
+    symbols.add_argument("symbols", nargs="*", help="exact symbol names")
+    symbols.add_argument("--prefix", action="append", default=[], help="find all symbols starting with this")
+    symbols.add_argument("--undefined", action="append", default=[], metavar="LIBRARY",
+                         help="find the symbols the library needs from other libraries")
+    symbols.add_argument("--folder", action="append", metavar="PACKAGE_FOLDER",
+                         help="package folders to index, all packages of the conan cache if not given")
+    args = parser.parse_args()
+    conan_api = ConanAPI()
+    # the user.debiantools confs of global.conf apply
+    conanfile = SimpleNamespace(conf=conan_api.config.global_conf, output=ConanOutput())
+    if args.command == "lookup":
+        for name in args.packages:
+            deb = lookup_deb(conanfile, args.archive, args.suites.split(","), name, args.version, args.arch,
+                             args.components.split(","))
+            print(f"{deb.package} {deb.version} {deb.arch}\n  {deb.url}\n  {deb.sha256}")
+    else:
+        folders = args.folder or [os.path.dirname(path) for path in
+                                  glob.glob(os.path.join(conan_api.home_folder, "p", "*", "p", LIBRARY_INDEX))]
+        update_symbol_index(conanfile, folders)
+        wanted = list(args.symbols)
+        for library in args.undefined:
+            info = read_elf(library)
+            if info is None:
+                raise ConanException(f"{library} is not an ELF shared library")
+            wanted.extend(symbol for symbol in info.undefined if symbol not in wanted)
+        for symbol, providers in symbol_providers(conanfile, wanted).items():
+            print(f"{symbol}: " + (", ".join(f"{p.package} {p.soname or p.library}" for p in providers) or "-"))
+        for prefix in args.prefix:
+            for provider in find_symbols(conanfile, prefix, prefix=True):
+                print(f"{provider.symbol}: {provider.package} {provider.soname or provider.library}")
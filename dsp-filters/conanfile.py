@@ -2,6 +2,12 @@ from conan import ConanFile
 from conan.tools.cmake import CMake, CMakeDeps, CMakeToolchain, cmake_layout
 from conan.tools.files import get
 
+try:
+    # exports copies it next to the recipe, so it is missing while exporting
+    from buildcache import apply_compiler_cache, compiler_cache
+except ImportError:
+    pass
+
 required_conan_version = ">=1.53.0"
 
 class DSPFiltersRecipe(ConanFile):
@@ -13,6 +19,7 @@ class DSPFiltersRecipe(ConanFile):
     license = "MIT"
     settings = "os", "arch", "compiler", "build_type"
 
+    exports = ["../buildcache.py"]
     exports_sources = ["CMakeLists.txt"]
 
     def layout(self):
@@ -23,14 +30,16 @@ class DSPFiltersRecipe(ConanFile):
 
     def generate(self):
         tc = CMakeToolchain(self)
+        apply_compiler_cache(self, tc)
         tc.generate()
         deps = CMakeDeps(self)
         deps.generate()
 
     def build(self):
         cmake = CMake(self)
-        cmake.configure()
-        cmake.build()
+        with compiler_cache(self):
+            cmake.configure()
+            cmake.build()
 
     def package(self):
         cmake = CMake(self)
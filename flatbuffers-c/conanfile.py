@@ -2,6 +2,12 @@ from conan import ConanFile
 from conan.tools.cmake import CMake, CMakeDeps, CMakeToolchain, cmake_layout
 from conan.tools.files import apply_conandata_patches, export_conandata_patches, get
 
+try:
+    # exports copies it next to the recipe, so it is missing while exporting
+    from buildcache import apply_compiler_cache, compiler_cache
+except ImportError:
+    pass
+
 required_conan_version = ">=1.53.0"
 
 class FlatbuffersConan(ConanFile):
@@ -18,6 +24,7 @@ class FlatbuffersConan(ConanFile):
                "tests": [True, False],
                "reflection": [True, False]}
     default_options = {"shared": False, "fPIC": True, "runtimeOnly": True, "tests": False, "reflection": False}
+    exports = ["../buildcache.py"]
 
     def export_sources(self):
         export_conandata_patches(self)
@@ -46,6 +53,7 @@ class FlatbuffersConan(ConanFile):
         # TODO: this setting was needed since CLang generated a warning in v 0.6.1. 
         # Check if this can be removed in future versions again 
         tc.variables["FLATCC_ALLOW_WERROR"] = False
+        apply_compiler_cache(self, tc)
         tc.generate()
 
         deps = CMakeDeps(self)
@@ -56,8 +64,9 @@ class FlatbuffersConan(ConanFile):
         # We don't need it as each version has it's own conan package anyway 
         apply_conandata_patches(self)
         cmake = CMake(self)
-        cmake.configure()
-        cmake.build()
+        with compiler_cache(self):
+            cmake.configure()
+            cmake.build()
 
     def package(self):
         cmake = CMake(self)
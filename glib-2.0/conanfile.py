@@ -6,7 +6,7 @@ from pathlib import Path
 try:
     # we can only use this file when running conan install. When exporting this recipe, the file does not yet exist
     # since it's in a different location and conan fails. In order to handle this, we need to catch this here
-    from debiantools import download_extract_deb, translate_arch, triplet_name
+    from debiantools import copy_linked, copy_runtime_libraries, download_extract_debs, library_folders, library_info, translate_arch, triplet_name, unresolved_dependencies, write_library_index
 except ImportError:
     pass 
 
@@ -23,13 +23,22 @@ class DebianDependencyConan(ConanFile):
     license = "LGPL"
     settings = "os", "arch"
     exports = ["../debiantools.py"]
+    # runtime_only packages just the shared libraries that the dynamic loader opens, without fetching the dev package
+    options = {"runtime_only": [True, False]}
+    default_options = {"runtime_only": False}
 
     # def requirements(self):
     #     if self.settings.os == "Linux":
     #         # todo: we should also add depdencies to libselinux.so.1, liblzma.so.5, libgcrypt.so.20
-    #         # right now this is handled by telling the linker to ignore unknown symbols in secondary dependencies
+    #         # right now this is handled by telling the linker to ignore unknown symbols in secondary dependencies,
+    #         # build() reports the debian dependencies that are still missing
     #         self.requires("libudev1/237@totemic/stable")
 
+    def config_options(self):
+        # on other platforms, the package only provides the header files
+        if self.settings.os != "Linux":
+            del self.options.runtime_only
+
     def build(self):
         # For anything non-linux, we will fetch the header files, using the x86 package
         if self.settings.arch == "x86_64":
@@ -55,28 +64,60 @@ class DebianDependencyConan(ConanFile):
         else:
             raise Exception("Todo: add binary urls for this architecture")
 
-        download_extract_deb(self, url_lib, sha_lib)
-        download_extract_deb(self, url_dev, sha_dev)
+        # only extract what package() copies
+        triplet = triplet_name(self, self.settings.os != "Linux")
+        if self.settings.os == "Linux":
+            debs = [(url_lib, sha_lib)]
+            if not self.options.get_safe("runtime_only"):
+                debs.append((url_dev, sha_dev))
+            includes = [f"lib/{triplet}/*", f"usr/lib/{triplet}/*", "usr/include/*"]
+        else:
+            # header only: the dev package has all headers, including glibconfig.h in its lib folder,
+            # the runtime package only has libraries that can't be used here
+            debs = [(url_dev, sha_dev)]
+            includes = ["usr/include/*", f"usr/lib/{triplet}/glib-2.0/include/*"]
+        download_extract_debs(self, debs, includes=includes + [f"usr/share/doc/{self.name}/copyright"])
+        if self.settings.os == "Linux":
+            for dependency in unresolved_dependencies(self):
+                self.output.warning(f"Debian dependency not covered by a requirement: {dependency}")
 
     def package(self):
         pattern = "*" if self.settings.os == "Linux" else "*.h"
         triplet = triplet_name(self, self.settings.os != "Linux")
-        copy(self, pattern, src=Path(self.build_folder)/"lib"/triplet, dst=Path(self.package_folder)/"lib")
-        copy(self, pattern, src=Path(self.build_folder)/"usr"/"lib"/triplet, dst=Path(self.package_folder)/"lib")
-        copy(self, "*", src=Path(self.build_folder)/"usr"/"include", dst=Path(self.package_folder)/"include")
+        if self.options.get_safe("runtime_only"):
+            # only the shared libraries named by their SONAME, no headers, static archives or development links
+            copy_runtime_libraries(self, src=Path(self.build_folder)/"lib"/triplet, dst=Path(self.package_folder)/"lib")
+            copy_runtime_libraries(self, src=Path(self.build_folder)/"usr"/"lib"/triplet, dst=Path(self.package_folder)/"lib")
+        else:
+            copy_linked(self, pattern, src=Path(self.build_folder)/"lib"/triplet, dst=Path(self.package_folder)/"lib")
+            copy_linked(self, pattern, src=Path(self.build_folder)/"usr"/"lib"/triplet, dst=Path(self.package_folder)/"lib")
+            copy_linked(self, "*", src=Path(self.build_folder)/"usr"/"include", dst=Path(self.package_folder)/"include")
         copy(self, "copyright", src=Path(self.build_folder)/"usr"/"share"/"doc"/self.name, dst=self.package_folder)
+        if self.settings.os == "Linux":
+            # index SONAME and NEEDED of the libraries once, package_info() derives the link order from it
+            write_library_index(self)
 
     def package_info(self):
         #self.cpp_info.libdirs = ["lib"]
 
         # we only add the libs on Linux, on other platforms just the include files
         if self.settings.os == "Linux":
-            # only export from pkginfo "gio-unix-2.0" for now, not gio-2.0, glib-2.0, gmodule-2.0, gmodule-export-2.0, gmodule-no-export-2.0, gobject-2.0, gthread-2.0
-            self.cpp_info.libs = ['gio-2.0', 'gobject-2.0', 'glib-2.0']
+            if self.options.get_safe("runtime_only"):
+                # nothing to compile or link against, the run environment only needs the folders of the libraries
+                self.cpp_info.includedirs = []
+                self.cpp_info.libdirs = library_folders(self)
+            else:
+                # only export from pkginfo "gio-unix-2.0" for now, not gio-2.0, glib-2.0, gmodule-2.0, gmodule-export-2.0, gmodule-no-export-2.0, gobject-2.0, gthread-2.0
+                # the NEEDED entries of the packaged libraries add the libs these need (e.g. gmodule-2.0) in link order
+                info = library_info(self, ['gio-2.0', 'gobject-2.0', 'glib-2.0'])
+                self.cpp_info.libdirs = info.libdirs
+                self.cpp_info.libs = info.libs
+                self.cpp_info.system_libs = info.system_libs
 
-        # add additional path to sub directories since some libraries use them this way
-        # add extra include path for glibconfig.h
-        self.cpp_info.includedirs = ["include", str(Path("include")/"glib-2.0"), str(Path("include")/"gio-unix-2.0"), str(Path("lib")/"glib-2.0"/"include")]
+        if not self.options.get_safe("runtime_only"):
+            # add additional path to sub directories since some libraries use them this way
+            # add extra include path for glibconfig.h
+            self.cpp_info.includedirs = ["include", str(Path("include")/"glib-2.0"), str(Path("include")/"gio-unix-2.0"), str(Path("lib")/"glib-2.0"/"include")]
 
         # https://github.com/conan-io/conan-center-index/blob/master/recipes/glib/all/conanfile.py
         # set these variables, so that the libostree recipe can call the native programs during run of "configuration" script
@@ -7,6 +7,12 @@ import os
 from conans import ConanFile, CMake, tools
 #from conans import ConanFile, AutoToolsBuildEnvironment, MSBuild, tools
 
+try:
+    # exports copies it next to the recipe, so it is missing while exporting
+    from buildcache import apply_compiler_cache, compiler_cache
+except ImportError:
+    pass
+
 
 class LibUSBConan(ConanFile):
     """Download libusb source, build and create package
@@ -23,7 +29,7 @@ class LibUSBConan(ConanFile):
     description = "A Simple library for communicating with USB and Bluetooth HID devices on Linux, Mac and Windows."
     _source_subfolder = "sources"
     generators = "cmake"
-    exports = ["LICENSE.md"]
+    exports = ["LICENSE.md", "../buildcache.py"]
     exports_sources = ["CMakeLists.txt"]
 
     def config_options(self):
@@ -54,12 +60,14 @@ class LibUSBConan(ConanFile):
         cmake.definitions["HIDAPI_BUILD_SHARED"] = self.options.shared
         if self.settings.os == "Linux":
             cmake.definitions["HIDAPI_BUILD_LIBUSB"] = self.options.libusb
+        apply_compiler_cache(self, cmake)
         cmake.configure()
         return cmake
 
     def build(self):
-        cmake = self._configure_cmake()
-        cmake.build()
+        with compiler_cache(self):
+            cmake = self._configure_cmake()
+            cmake.build()
 
     def package(self):
         cmake = self._configure_cmake()
@@ -5,7 +5,7 @@ from pathlib import Path
 try:
     # we can only use this file when running conan install. When exporting this recipe, the file does not yet exist
     # since it's in a different location and conan fails. In order to handle this, we need to catch this here
-    from debiantools import copy_cleaned_no_prefix, download_extract_deb, translate_arch, triplet_name
+    from debiantools import copy_cleaned_no_prefix, copy_linked, copy_runtime_libraries, download_extract_debs, library_folders, library_info, translate_arch, triplet_name, write_library_index
 except ImportError:
     pass 
 
@@ -22,6 +22,9 @@ class DebianDependencyConan(ConanFile):
     license = "GNU Lesser General Public License"
     settings = "os", "arch"
     exports = ["../debiantools.py"]
+    # runtime_only packages just the shared libraries that the dynamic loader opens, without fetching the dev package
+    options = {"runtime_only": [True, False]}
+    default_options = {"runtime_only": False}
 
     def build(self):
         if self.settings.os == "Linux":
@@ -49,13 +52,25 @@ class DebianDependencyConan(ConanFile):
                 raise Exception("Todo: add binary urls for this architecture")
         else:
             raise Exception("Binary does not exist for these settings")
-        download_extract_deb(self, url_lib, sha_lib)
-        download_extract_deb(self, url_dev, sha_dev)
+        debs = [(url_lib, sha_lib)]
+        if not self.options.runtime_only:
+            debs.append((url_dev, sha_dev))
+        # only extract what package() copies
+        download_extract_debs(self, debs, includes=[
+            f"usr/lib/{triplet_name(self)}/*",
+            "usr/include/*",
+            f"usr/share/doc/{self.name}/copyright"])
 
     def package(self):
-        copy(self, "*", src=Path(self.build_folder)/"usr"/"lib"/triplet_name(self), dst=Path(self.package_folder)/"lib")
-        copy(self, "*", src=Path(self.build_folder)/"usr"/"include", dst=Path(self.package_folder)/"include")
+        if self.options.runtime_only:
+            # only the shared libraries named by their SONAME, no headers, static archives or development links
+            copy_runtime_libraries(self, src=Path(self.build_folder)/"usr"/"lib"/triplet_name(self), dst=Path(self.package_folder)/"lib")
+        else:
+            copy_linked(self, "*", src=Path(self.build_folder)/"usr"/"lib"/triplet_name(self), dst=Path(self.package_folder)/"lib")
+            copy_linked(self, "*", src=Path(self.build_folder)/"usr"/"include", dst=Path(self.package_folder)/"include")
         copy(self, "copyright", src=Path(self.build_folder)/"usr"/"share"/"doc"/self.name, dst=self.package_folder)
+        # index SONAME and NEEDED of the libraries once, package_info() derives the link order from it
+        write_library_index(self)
 
     def package_info(self):
         # pkgconfigpath = str(Path(self.package_folder)/"lib"/"pkgconfig")
@@ -73,9 +88,17 @@ class DebianDependencyConan(ConanFile):
         #self.output.info(f"pkg_config.libs_only_l: {pkg_config.libs} - {pkg_config._get_option('libs-only-l').split()}")
         #self.output.info(f"pkg_config.cflags_only_I: {pkg_config.includedirs} - {pkg_config._get_option('cflags-only-I').split()}")
 
-        self.cpp_info.libdirs = ["lib"]
-        self.cpp_info.libs = ["asound"]
-        self.cpp_info.includedirs = ["include", "include/alsa"]
+        if self.options.runtime_only:
+            # nothing to compile or link against, the run environment only needs the folders of the libraries
+            self.cpp_info.includedirs = []
+            self.cpp_info.libdirs = library_folders(self)
+        else:
+            # libs, libdirs and system libs follow from the SONAME and NEEDED entries of the packaged libraries
+            info = library_info(self, ["asound"])
+            self.cpp_info.libdirs = info.libdirs
+            self.cpp_info.libs = info.libs
+            self.cpp_info.system_libs = info.system_libs
+            self.cpp_info.includedirs = ["include", "include/alsa"]
 
         self.output.info(f"libdirs {self.cpp_info.libdirs}")
         self.output.info(f"libs: {self.cpp_info.libs}")
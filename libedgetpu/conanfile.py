@@ -1,6 +1,8 @@
 import os
+import time
 from os.path import join
 
+from conan.tools.build import build_jobs
 from conans import ConanFile, tools, AutoToolsBuildEnvironment
 from conans.errors import ConanInvalidConfiguration
 
@@ -15,8 +17,9 @@ class LibEdgeTpuConan(ConanFile):
     url = "https://github.com/totemic/conan-package-recipes"
 
     settings = "os", "arch", "compiler", "build_type"
-    options = {'throttled': [True, False]}
-    default_options = {'throttled': False}
+    # all_variants builds the direct and the throttled library from one set of objects and packages both
+    options = {'throttled': [True, False], 'all_variants': [True, False]}
+    default_options = {'throttled': False, 'all_variants': False}
 
     exports = ["patches/*"]
 
@@ -30,10 +33,74 @@ class LibEdgeTpuConan(ConanFile):
     def _should_use_bazel(self):
         return self.settings.os == 'Macos'
 
+    @property
+    def _variants(self):
+        if self.options.all_variants:
+            return ['direct', 'throttled']
+        return ['throttled' if self.options.throttled else 'direct']
+
+    @staticmethod
+    def _available_memory():
+        # in bytes, None where /proc/meminfo doesn't exist or is too old to have MemAvailable
+        try:
+            with open("/proc/meminfo") as f:
+                for line in f:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return None
+
+    def _make_jobs(self):
+        # tools.build:jobs or the number of cores, but not more compilers than the memory holds: the TF Lite
+        # translation units need about a GB each
+        jobs = build_jobs(self)
+        memory_per_job = self.conf.get("user.libedgetpu:memory_per_job", default=1024, check_type=int)
+        available = self._available_memory()
+        if available is not None and memory_per_job > 0:
+            jobs = max(1, min(jobs, available // (memory_per_job * 1024 * 1024)))
+        return jobs
+
+    def _timed_compiler(self, log):
+        # wraps the compiler of the Makefile build and appends "<milliseconds> <output file>" to log for every call
+        wrapper = join(self.build_folder, "timed_cxx.sh")
+        compiler = os.environ.get("CXX", "g++")
+        tools.save(wrapper, f"""#!/bin/sh
+start=$(date +%s%N)
+{compiler} "$@"
+status=$?
+end=$(date +%s%N)
+target=
+while [ $# -gt 0 ]; do
+    if [ "$1" = "-o" ]; then target=$2; fi
+    shift
+done
+echo "$(( (end - start) / 1000000 )) $target" >> "{log}"
+exit $status
+""")
+        os.chmod(wrapper, 0o755)
+        return wrapper
+
+    def _report_compile_times(self, log, wall_time):
+        times = []
+        if not os.path.exists(log):
+            # nothing was out of date
+            return
+        with open(log) as f:
+            for line in f:
+                milliseconds, _, target = line.rstrip("\n").partition(" ")
+                times.append((int(milliseconds) / 1000, os.path.relpath(target, self.source_folder)))
+        self.output.info(f"Compiled {len(times)} targets in {wall_time:.0f}s, "
+                         f"{sum(seconds for seconds, _ in times):.0f}s of compiler time. Slowest targets:")
+        for seconds, target in sorted(times, reverse=True)[:10]:
+            self.output.info(f"{seconds:8.1f}s {target}")
+
     def package_id(self):
         # Making sure that changes in minor version or options of `tensorflow-lite` trigger a unique package id
         # https://docs.conan.io/en/latest/creating_packages/define_abi_compatibility.html
         self.info.requires["tensorflow-lite"].full_package_mode()
+        if self.options.all_variants:
+            del self.info.options.throttled
 
     def configure(self):
         is_linux = self.settings.os == 'Linux' and self.settings.arch in ('x86_64', 'armv8')
@@ -79,15 +146,25 @@ class LibEdgeTpuConan(ConanFile):
                 env_vars["CPU"] = "aarch64"
 
             with tools.environment_append(env_vars):
-                suffix = 'throttled' if self.options.throttled else 'direct'
-                self.run(f"make -C {self.source_folder} libedgetpu-{suffix}")
+                targets = " ".join(f"libedgetpu-{variant}" for variant in self._variants)
+                self.run(f"make -C {self.source_folder} {targets}")
         else:
             autotools = AutoToolsBuildEnvironment(self)
-            suffix = '-throttled' if self.options.throttled else ''
-            autotools.make(target=f"-f {self.source_folder}/makefile_build/Makefile -j6 libedgetpu{suffix}")
+            # one make call for both variants, so the objects that they share are only compiled once
+            targets = " ".join('libedgetpu-throttled' if variant == 'throttled' else 'libedgetpu'
+                               for variant in self._variants)
+            jobs = self._make_jobs()
+            self.output.info(f"Building with {jobs} jobs")
+            log = join(self.build_folder, "compile_times.log")
+            if os.path.exists(log):
+                os.remove(log)
+            start = time.monotonic()
+            # passing -j keeps the helper from adding its own job count
+            autotools.make(target=f"-f {self.source_folder}/makefile_build/Makefile {targets}",
+                           args=[f"-j{jobs}", f"CXX={self._timed_compiler(log)}"])
+            self._report_compile_times(log, time.monotonic() - start)
 
     def package(self):
-        variant = 'throttled' if self.options.throttled else 'direct'
         bin_dir = join(self.source_folder, 'out')
         include_dir = join(self.source_folder, 'tflite', 'public')
 
@@ -106,20 +183,34 @@ class LibEdgeTpuConan(ConanFile):
 
         self.copy("LICENSE", src=self.source_folder, dst="licenses", keep_path=False)
         self.copy("*.h", src=include_dir, dst="include", keep_path=False)
-        self.copy("*", src=f"{bin_dir}/{variant}/{arch}", dst="lib", keep_path=False, symlinks=True)
-
-        with tools.chdir(f"{self.package_folder}/lib"):
-            os.symlink(lib_name, link_name)
-
-        # Remove absolute path to libusb from the mac binary
-        # otool -L libedgetpu.1.0.dylib
-        # otool -l libedgetpu.1.0.dylib | grep LC_RPATH -A2
-        if self.settings.os == 'Macos':
-            # TODO: fix this in the libusb package when building
-            self.output.info("Removing hardcoded path from the libusb dependency")
-            libusb_root = self.deps_cpp_info["libusb"].rootpath
-            self.run(f"install_name_tool -change {libusb_root}/lib/libusb-1.0.0.dylib @rpath/libusb-1.0.0.dylib "
-                     f"{self.package_folder}/lib/{lib_name}")
+        for variant in self._variants:
+            # both variants have the same SONAME, so the throttled one goes next to the direct one with all_variants
+            lib_dir = self._lib_dir(variant)
+            self.copy("*", src=f"{bin_dir}/{variant}/{arch}", dst=lib_dir, keep_path=False, symlinks=True)
+
+            with tools.chdir(f"{self.package_folder}/{lib_dir}"):
+                os.symlink(lib_name, link_name)
+
+            # Remove absolute path to libusb from the mac binary
+            # otool -L libedgetpu.1.0.dylib
+            # otool -l libedgetpu.1.0.dylib | grep LC_RPATH -A2
+            if self.settings.os == 'Macos':
+                # TODO: fix this in the libusb package when building
+                self.output.info("Removing hardcoded path from the libusb dependency")
+                libusb_root = self.deps_cpp_info["libusb"].rootpath
+                self.run(f"install_name_tool -change {libusb_root}/lib/libusb-1.0.0.dylib @rpath/libusb-1.0.0.dylib "
+                         f"{self.package_folder}/{lib_dir}/{lib_name}")
+
+    def _lib_dir(self, variant):
+        return "lib/throttled" if self.options.all_variants and variant == 'throttled' else "lib"
 
     def package_info(self):
-        self.cpp_info.libs = ["edgetpu"]
+        if self.options.all_variants:
+            # consumers pick one of them, e.g. libedgetpu::throttled
+            for variant in self._variants:
+                component = self.cpp_info.components[variant]
+                component.libs = ["edgetpu"]
+                component.libdirs = [self._lib_dir(variant)]
+                component.requires = ["tensorflow-lite::tensorflow-lite", "libusb::libusb"]
+        else:
+            self.cpp_info.libs = ["edgetpu"]
@@ -7,6 +7,12 @@ from conan.tools.gnu import Autotools, AutotoolsDeps, AutotoolsToolchain, PkgCon
 from conan.tools.layout import basic_layout
 from pathlib import Path
 
+try:
+    # exports copies it next to the recipe, so it is missing while exporting
+    from buildcache import apply_compiler_cache, cached_autoreconf, cached_configure, compiler_cache
+except ImportError:
+    pass
+
 required_conan_version = ">=1.53.0"
 
 # TODO: switch to https://github.com/conan-io/conan-center-index/blob/master/recipes/libgpiod once it supports v1.2.1
@@ -22,6 +28,7 @@ class LibgpiodConan(ConanFile):
     settings = "os", "compiler", "build_type", "arch"
     options = {"shared": [True, False], "fPIC": [True, False]}
     default_options = {"shared": False, "fPIC": True}
+    exports = ["../buildcache.py"]
 
     def build_requirements(self):
         if self.settings.os == "Linux":
@@ -66,6 +73,7 @@ class LibgpiodConan(ConanFile):
             # fixes error "undefined reference to `rpl_malloc'"
             tc.configure_args.append("ac_cv_func_malloc_0_nonnull=yes")
             tc.configure_args.append("ac_cv_func_realloc_0_nonnull=yes")
+        apply_compiler_cache(self, tc)
         tc.generate()
 
         # env = tc.environment()
@@ -79,9 +87,11 @@ class LibgpiodConan(ConanFile):
     def build(self):
         if self.settings.os == "Linux":
             autotools = Autotools(self)
-            autotools.autoreconf()
-            autotools.configure()
-            autotools.make()
+            # the generated configure script and the results of its probes are reused from earlier builds
+            cached_autoreconf(self, autotools)
+            with compiler_cache(self):
+                cached_configure(self, autotools)
+                autotools.make()
         else:
             # We allow using it on all platforms, but for anything except Linux nothing is produced
             # this allows unconditionally including this conan package on all platforms
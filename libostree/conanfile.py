@@ -11,6 +11,14 @@ from conan.tools.layout import basic_layout
 import os
 from pathlib import Path
 
+try:
+    # we can only use this file when running conan install. When exporting this recipe, the file does not yet exist
+    # since it's in a different location and conan fails. In order to handle this, we need to catch this here
+    from buildcache import apply_compiler_cache, cached_configure, compiler_cache
+    from debiantools import cross_sysroot
+except ImportError:
+    pass
+
 required_conan_version = ">=1.53.0"
 
 class LibOSTreeConan(ConanFile):
@@ -26,6 +34,12 @@ class LibOSTreeConan(ConanFile):
     description = "libostree is both a shared library and suite of command line tools that combines a git-like model for committing and downloading bootable filesystem trees, along with a layer for deploying them and managing the bootloader configuration"
     _source_subfolder = "source_subfolder"
     #exports = ["LICENSE.md"]
+    exports = ["../buildcache.py", "../debiantools.py"]
+    # debian packages to compile and link against, resolved with their dependencies from the same Ubuntu release
+    # as the glib-2.0 requirement. The pinned versions are the ones the glib-2.0 and libsystemd0 recipes package
+    _sysroot_suites = ["bionic-updates", "bionic"]
+    _sysroot_packages = ["libglib2.0-dev=2.56.4-0ubuntu0.18.04.9", "liblzma-dev", "libmount-dev", "e2fslibs-dev",
+                         "libfuse-dev", "libcurl4-openssl-dev", "libsystemd-dev=237-3ubuntu10.57", "libgpgme-dev"]
 
     def layout(self):
         basic_layout(self, src_folder="src")
@@ -39,42 +53,12 @@ class LibOSTreeConan(ConanFile):
             # right now this is handled by telling the linker to ignore unknown symbols in secondary dependencies
         #     self.requires("libcurl/7.66.0@totemic/stable")
 
-    def build_requirements(self): 
-        # installer = tools.SystemPackageTool()
-        # installer = tools.SystemPackageTool(default_mode="disabled")
-        # installer.install("libtool bison:amd64 libglib2.0-dev:arm64", update=True, force=True)
-        # installer.install(["libtool", "bison:amd64", "libglib2.0-dev:arm64"], update=True)
-        # installer.install(["libtool bison"], update=True)
-        # installer.install(["libtool bison libglib2.0-dev liblzma-dev libmount-dev e2fslibs-dev libfuse-dev libcurl4-openssl-dev libsystemd-dev libgpgme-dev"], update=False, arch_names=)
-
-        # tools.SystemPackageTool() doesn't support a mode where we install some native and some cross-compile libraries
-        # for now, we'll directly execute apt, which will only work on debian systems
+    def build_requirements(self):
+        # the libraries to compile against come from a sysroot of debian packages made in generate(),
+        # instead of installing them on the build machine with apt
         if self.settings.os == "Linux":
-        #if tools.os_info.with_apt:
-            self.run("sudo apt-get update")
-            # build host dependencies
-            self.run("sudo apt-get install -y --no-install-recommends libtool bison")
-            # cross-compilation libraries
-            packages = "libglib2.0-dev liblzma-dev libmount-dev e2fslibs-dev libfuse-dev libcurl4-openssl-dev libsystemd-dev libgpgme-dev".split(" ")
-            parsed_packages = [self.get_package_name(pkg, str(self.settings.arch)) for pkg in packages]
-            self.output.info(f'sudo apt-get install {" ".join(parsed_packages)}')
-            self.run("sudo apt-get install -y --no-install-recommends %s" % " ".join(parsed_packages))
-            self.output.info("after build_requirements")
-        #else: 
-        #    self.output.warn("Unsupported Linux version. Cannot install build dependencies, requires apt tooling.")
-
-    def get_package_name(self, package, arch):
-        arch_names = {"x86_64": "amd64",
-                        "x86": "i386",
-                        "ppc32": "powerpc",
-                        "ppc64le": "ppc64el",
-                        "armv7": "arm",
-                        "armv7hf": "armhf",
-                        "armv8": "arm64",
-                        "s390x": "s390x"}
-        if arch in arch_names:
-            return "%s:%s" % (package, arch_names[arch])
-        return package
+            self.tool_requires("libtool/2.4.7")
+            self.tool_requires("bison/3.8.2")
 
     def source(self):
         get(self, **self.conan_data["sources"][self.version], strip_root=True)
@@ -112,6 +96,12 @@ class LibOSTreeConan(ConanFile):
         #'--prefix=/home/conan/.conan/data/libostree/2022.1/totemic/stable/package/2a7b9f2a721e6eadffccde89211f77ec6e2b6307'
         tc = AutotoolsToolchain(self, prefix="")
 
+        # the sysroot is cached by the hash of the resolved packages, so only the first build downloads them
+        archive = "ubuntu" if self.settings.arch in ["x86", "x86_64"] else "ubuntu-ports"
+        sysroot = cross_sysroot(self, archive, self._sysroot_suites, self._sysroot_packages)
+        # let the linker find the libraries that the linked sysroot libraries need
+        tc.extra_ldflags.append("-Wl,-rpath-link," + ":".join(sysroot.libdirs))
+
         # these setting not needed, are added automatically by AutotoolsToolchain 
         # if self.options.shared:
         #     cfgArgs += ["--enable-shared", "--disable-static"]
@@ -120,11 +110,14 @@ class LibOSTreeConan(ConanFile):
         #tc.fpic = self.options.get_safe("fPIC", True)
 
         tc.configure_args.extend(cfgArgs)
+        apply_compiler_cache(self, tc)
 
         # set BASH_COMPLETIONSDIR to fixed value that honors ${prefix}. 
         # Otherwise it is set through pkgconfig variables and might fail in the installation step if it points to /usr/share 
         env = tc.environment()
         env.define("BASH_COMPLETIONSDIR", "${prefix}/share/bash-completion/completions")
+        # the pkg-config files of the sysroot point into it, the ones of the conan requirements come first
+        env.append_path("PKG_CONFIG_PATH", sysroot.pkg_config_path)
         tc.generate(env)
 
         AutotoolsDeps(self).generate()
@@ -136,8 +129,10 @@ class LibOSTreeConan(ConanFile):
         if self.settings.os == "Linux":
             autotools = Autotools(self)
             #autotools.autoreconf()
-            autotools.configure()
-            autotools.make()
+            with compiler_cache(self):
+                # the results of the feature probes are reused from earlier builds with the same toolchain
+                cached_configure(self, autotools)
+                autotools.make()
         else:
             # We allow using it on all platforms, but for anything except Linux nothing is produced
             # this allows unconditionally including this conan package on all platforms
@@ -1,13 +1,12 @@
 from conan import ConanFile
 from conan.errors import ConanInvalidConfiguration
 from conan.tools.files import copy
-import os
 from pathlib import Path
 
 try:
     # we can only use this file when running conan install. When exporting this recipe, the file does not yet exist
     # since it's in a different location and conan fails. In order to handle this, we need to catch this here
-    from debiantools import download_extract_deb, translate_arch, triplet_name
+    from debiantools import copy_linked, copy_runtime_libraries, download_extract_debs, library_folders, library_info, translate_arch, triplet_name, write_library_index
 except ImportError:
     pass 
 
@@ -25,6 +24,9 @@ class DebianDependencyConan(ConanFile):
     license = "GNU Lesser General Public License"
     settings = "os", "arch"
     exports = ["../debiantools.py"]
+    # runtime_only packages just the shared libraries that the dynamic loader opens, without fetching the dev package
+    options = {"runtime_only": [True, False]}
+    default_options = {"runtime_only": False}
     
     def build(self):
         if self.settings.os == "Linux":
@@ -47,25 +49,45 @@ class DebianDependencyConan(ConanFile):
                 % (str(self.version), self.build_version, translate_arch(self)))
         else:
             raise Exception("Binary does not exist for these settings")
-        download_extract_deb(self, url_lib, sha_lib)
-        download_extract_deb(self, url_dev, sha_dev)
-        
+        debs = [(url_lib, sha_lib)]
+        if not self.options.runtime_only:
+            debs.append((url_dev, sha_dev))
+        # only extract what package() copies
         # we are currently not supporting the use of https://packages.debian.org/buster/libpulse-mainloop-glib0
-        # remove the symlink here. If needed, it can be imported with the same steps as above
-        mainloop_glib_so_path = "usr/lib/%s/libpulse-mainloop-glib.so" % triplet_name(self)
-        os.remove(mainloop_glib_so_path)
+        # skip its symlink here. If needed, it can be imported with the same steps as above
+        download_extract_debs(self, debs, includes=[
+            f"usr/lib/{triplet_name(self)}/*",
+            "usr/include/*",
+            f"usr/share/doc/{self.name}/copyright"
+        ], excludes=[
+            f"usr/lib/{triplet_name(self)}/libpulse-mainloop-glib.so"])
 
     def package(self):
-        copy(self, "*", src=Path(self.build_folder)/"usr"/"lib"/triplet_name(self), dst=Path(self.package_folder)/"lib")
-        copy(self, "*", src=Path(self.build_folder)/"usr"/"include", dst=Path(self.package_folder)/"include")
+        if self.options.runtime_only:
+            # only the shared libraries named by their SONAME, no headers, static archives or development links
+            copy_runtime_libraries(self, src=Path(self.build_folder)/"usr"/"lib"/triplet_name(self), dst=Path(self.package_folder)/"lib")
+        else:
+            copy_linked(self, "*", src=Path(self.build_folder)/"usr"/"lib"/triplet_name(self), dst=Path(self.package_folder)/"lib")
+            copy_linked(self, "*", src=Path(self.build_folder)/"usr"/"include", dst=Path(self.package_folder)/"include")
         copy(self, "copyright", src=Path(self.build_folder)/"usr"/"share"/"doc"/self.name, dst=self.package_folder)
+        if self.settings.os == "Linux":
+            # index SONAME and NEEDED of the libraries once, package_info() derives the link order from it.
+            # libpulse finds libpulsecommon in lib/pulseaudio through its RUNPATH instead of LD_LIBRARY_PATH
+            write_library_index(self, origin_runpath=True)
 
     def package_info(self):
         if self.settings.os == "Linux":
-            # need to add a library path from field Libs.private of pkg-config
-            self.cpp_info.libdirs = ["lib", "lib/pulseaudio"]
-            # need to also add the pulsecommon library from field Libs.private of pkg-config
-            self.cpp_info.libs = ['pulse-simple', 'pulse', f'pulsecommon-{self.version}']
+            if self.options.runtime_only:
+                # nothing to compile or link against, the run environment only needs the folders of the libraries
+                self.cpp_info.includedirs = []
+                self.cpp_info.libdirs = library_folders(self)
+            else:
+                # pulse-simple needs pulse, both need pulsecommon-<version> in lib/pulseaudio (Libs.private of pkg-config).
+                # They find it through their RUNPATH, so lib/pulseaudio is only a libdir if package() couldn't set it
+                info = library_info(self, ['pulse-simple'])
+                self.cpp_info.libdirs = info.libdirs
+                self.cpp_info.libs = info.libs
+                self.cpp_info.system_libs = info.system_libs
             #self.cpp_info.includedirs = ["include"]
             self.output.info(f"libdirs {self.cpp_info.libdirs}")
             self.output.info(f"libs: {self.cpp_info.libs}")
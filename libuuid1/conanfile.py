@@ -1,13 +1,12 @@
 from conan import ConanFile
 from conan.errors import ConanInvalidConfiguration
 from conan.tools.files import copy
-import os
 from pathlib import Path
 
 try:
     # we can only use this file when running conan install. When exporting this recipe, the file does not yet exist
     # since it's in a different location and conan fails. In order to handle this, we need to catch this here
-    from debiantools import download_extract_deb, translate_arch, triplet_name
+    from debiantools import copy_linked, copy_runtime_libraries, download_extract_debs, library_folders, library_info, translate_arch, triplet_name, write_library_index
 except ImportError:
     pass 
 
@@ -24,6 +23,9 @@ class DebianDependencyConan(ConanFile):
     license = "BSD-3-clause"
     settings = "os", "arch"
     exports = ["../debiantools.py"]
+    # runtime_only packages just the shared libraries that the dynamic loader opens, without fetching the dev package
+    options = {"runtime_only": [True, False]}
+    default_options = {"runtime_only": False}
 
     def build(self):
         if self.settings.os == "Linux":
@@ -50,26 +52,45 @@ class DebianDependencyConan(ConanFile):
             else:
                 raise Exception("Todo: add binary urls for this architecture")
 
-            download_extract_deb(self, url_lib, sha_lib)
-            download_extract_deb(self, url_dev, sha_dev)
-            # remove libuuid.so which is an absolute link to /lib/arm-linux-gnueabihf/libuuid.so.1.3.0
-            libuuid_so_path = "usr/lib/%s/libuuid.so" % triplet_name(self)
-            os.remove(libuuid_so_path)
-            os.symlink("libuuid.so.1.3.0", libuuid_so_path)
+            debs = [(url_lib, sha_lib)]
+            if not self.options.runtime_only:
+                debs.append((url_dev, sha_dev))
+            # only extract what package() copies
+            download_extract_debs(self, debs, includes=[
+                f"lib/{triplet_name(self)}/*",
+                f"usr/lib/{triplet_name(self)}/*",
+                "usr/include/*",
+                f"usr/share/doc/{self.name}/copyright"])
         else:
             self.output.info("Nothing to be done for this OS")
 
     def package(self):
-        copy(self, "*", src=Path(self.build_folder)/"lib"/triplet_name(self), dst=Path(self.package_folder)/"lib")
-        copy(self, "*", src=Path(self.build_folder)/"usr"/"lib"/triplet_name(self), dst=Path(self.package_folder)/"lib")
-        copy(self, "*", src=Path(self.build_folder)/"usr"/"include", dst=Path(self.package_folder)/"include")
+        if self.options.runtime_only:
+            # only the shared libraries named by their SONAME, no headers, static archives or development links
+            copy_runtime_libraries(self, src=Path(self.build_folder)/"lib"/triplet_name(self), dst=Path(self.package_folder)/"lib")
+            copy_runtime_libraries(self, src=Path(self.build_folder)/"usr"/"lib"/triplet_name(self), dst=Path(self.package_folder)/"lib")
+        else:
+            copy_linked(self, "*", src=Path(self.build_folder)/"lib"/triplet_name(self), dst=Path(self.package_folder)/"lib")
+            copy_linked(self, "*", src=Path(self.build_folder)/"usr"/"lib"/triplet_name(self), dst=Path(self.package_folder)/"lib")
+            copy_linked(self, "*", src=Path(self.build_folder)/"usr"/"include", dst=Path(self.package_folder)/"include")
         copy(self, "copyright", src=Path(self.build_folder)/"usr"/"share"/"doc"/self.name, dst=self.package_folder)
+        if self.settings.os == "Linux":
+            # index SONAME and NEEDED of the libraries once, package_info() derives the link order from it
+            write_library_index(self)
 
 
     def package_info(self):
         if self.settings.os == "Linux":
-            #self.cpp_info.libdirs = ["lib"]
-            self.cpp_info.libs = ["uuid"]
+            if self.options.runtime_only:
+                # nothing to compile or link against, the run environment only needs the folders of the libraries
+                self.cpp_info.includedirs = []
+                self.cpp_info.libdirs = library_folders(self)
+            else:
+                # libs, libdirs and system libs follow from the SONAME and NEEDED entries of the packaged libraries
+                info = library_info(self, ["uuid"])
+                self.cpp_info.libdirs = info.libdirs
+                self.cpp_info.libs = info.libs
+                self.cpp_info.system_libs = info.system_libs
             #self.cpp_info.includedirs = ["include"]
             self.output.info(f"libdirs {self.cpp_info.libdirs}")
             self.output.info(f"libs: {self.cpp_info.libs}")
@@ -13,9 +13,10 @@ import os
 try:
     # we can only use this file when running conan install. When exporting this recipe, the file does not yet exist
     # since it's in a different location and conan fails. In order to handle this, we need to catch this here
-    from debiantools import download_extract_deb, translate_arch, triplet_name
+    from buildcache import apply_compiler_cache, cached_configure, compiler_cache
+    from debiantools import copy_linked, download_extract_debs, translate_arch, triplet_name
 except ImportError:
-    pass 
+    pass
 
 required_conan_version = ">=1.53.0"
 
@@ -78,7 +79,7 @@ class Mpg123Conan(ConanFile):
         "module": "coreaudio",
     }
 
-    exports = ["../debiantools.py"]
+    exports = ["../buildcache.py", "../debiantools.py"]
 
     @property
     def _settings_build(self):
@@ -183,6 +184,7 @@ class Mpg123Conan(ConanFile):
             tc.variables["USE_MODULES"] = False
             tc.variables["CHECK_MODULES"] = self._audio_module
             tc.variables["WITH_SEEKTABLE"] = self.fixed_options["seektable"]
+            apply_compiler_cache(self, tc)
             tc.generate()
             tc = CMakeDeps(self)
             tc.generate()
@@ -209,6 +211,7 @@ class Mpg123Conan(ConanFile):
             if is_apple_os(self):
                 # Needed for fix_apple_shared_install_name invocation in package method
                 tc.extra_cflags = ["-headerpad_max_install_names"]
+            apply_compiler_cache(self, tc)
             tc.generate()
             tc = AutotoolsDeps(self)
             tc.generate()
@@ -247,27 +250,30 @@ class Mpg123Conan(ConanFile):
             url_dev = ("http://ftp.us.debian.org/debian/pool/main/m/mpg123/libmpg123-dev_%s-%s_%s.deb"
                 % (str(self.version), self.debian_build_version, translate_arch(self)))
 
-            download_extract_deb(self, url_lib, sha_lib)
-            download_extract_deb(self, url_out, sha_out)
-            download_extract_deb(self, url_dev, sha_dev)
+            # only extract what package() copies
+            download_extract_debs(self, [(url_lib, sha_lib), (url_out, sha_out), (url_dev, sha_dev)], includes=[
+                f"usr/lib/{triplet_name(self)}/*",
+                "usr/include/*",
+                f"usr/share/doc/{self.name}/copyright"])
             return
 
 
         apply_conandata_patches(self)
-        if is_msvc(self):
-            cmake = CMake(self)
-            cmake.configure(build_script_folder=os.path.join(self.source_folder, "ports", "cmake"))
-            cmake.build()
-        else:
-            autotools = Autotools(self)
-            autotools.configure()
-            autotools.make()
+        with compiler_cache(self):
+            if is_msvc(self):
+                cmake = CMake(self)
+                cmake.configure(build_script_folder=os.path.join(self.source_folder, "ports", "cmake"))
+                cmake.build()
+            else:
+                autotools = Autotools(self)
+                cached_configure(self, autotools)
+                autotools.make()
 
     def package(self):
         # on Linux, use the ready made binary libraries
         if self.settings.os == "Linux":
-            copy(self, "*", src=os.path.join(self.build_folder, "usr/lib", triplet_name(self)), dst=os.path.join(self.package_folder, "lib"))
-            copy(self, "*", src=os.path.join(self.build_folder, "usr/include"), dst=os.path.join(self.package_folder, "include"))
+            copy_linked(self, "*", src=os.path.join(self.build_folder, "usr/lib", triplet_name(self)), dst=os.path.join(self.package_folder, "lib"))
+            copy_linked(self, "*", src=os.path.join(self.build_folder, "usr/include"), dst=os.path.join(self.package_folder, "include"))
             copy(self, "copyright", src=os.path.join(self.build_folder, "usr/share/doc", self.name), dst=self.package_folder)
             return
 
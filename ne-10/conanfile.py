@@ -4,6 +4,12 @@ from conan.tools.cmake import CMake, CMakeDeps, CMakeToolchain, cmake_layout
 from conan.tools.files import apply_conandata_patches, collect_libs, export_conandata_patches, get
 from pathlib import Path
 
+try:
+    # exports copies it next to the recipe, so it is missing while exporting
+    from buildcache import apply_compiler_cache, compiler_cache
+except ImportError:
+    pass
+
 required_conan_version = ">=1.53.0"
 
 class Ne10Conan(ConanFile):
@@ -19,6 +25,7 @@ class Ne10Conan(ConanFile):
     default_options = {"shared": False,
                        "fPIC": True}    
     # exports = "LICENSE"
+    exports = ["../buildcache.py"]
 
     def export_sources(self):
         export_conandata_patches(self)
@@ -55,6 +62,7 @@ class Ne10Conan(ConanFile):
         tc.variables["NE10_BUILD_ARM_ONLY"] = armOnly
         tc.variables["NE10_BUILD_SHARED"] = bool(self.options.shared)
         tc.variables["NE10_BUILD_STATIC"] = not self.options.shared
+        apply_compiler_cache(self, tc)
         tc.generate()
 
         deps = CMakeDeps(self)
@@ -63,8 +71,9 @@ class Ne10Conan(ConanFile):
     def build(self):
         apply_conandata_patches(self)
         cmake = CMake(self)
-        cmake.configure()
-        cmake.build()
+        with compiler_cache(self):
+            cmake.configure()
+            cmake.build()
 
     def package(self):
         cmake = CMake(self)
@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Mirror failover, speed limit, resume and checksum handling of download_extract_debs(), against local
+HTTP servers standing in for the mirrors:
+
+    python -m pytest tests
+"""
+
+import functools
+import hashlib
+import io
+import os
+import socket
+import sys
+import tarfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from conan.errors import ConanException
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import debiantools  # noqa: E402
+
+LIBRARY = "usr/lib/x86_64-linux-gnu/libfoo.so.1"
+# large enough for several reads, so a download can be slowed down or cut off in the middle
+LIBRARY_SIZE = 2 * 1024 * 1024
+
+
+class _Output:
+    def __init__(self):
+        self.warnings = []
+
+    def info(self, msg):
+        pass
+
+    def warning(self, msg):
+        self.warnings.append(msg)
+
+    highlight = success = error = info
+
+
+class _Conf(dict):
+    def get(self, name, default=None, check_type=None):
+        return dict.get(self, name, default)
+
+
+class _Conanfile:
+    """Just what debiantools needs of a conanfile."""
+
+    def __init__(self, build_folder, **conf):
+        self.build_folder = str(build_folder)
+        self.output = _Output()
+        self.conf = _Conf(conf)
+
+
+def _tar(files):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        for name, data in files.items():
+            info = tarfile.TarInfo("./" + name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def _ar(members):
+    data = b"!<arch>\n"
+    for name, content in members:
+        data += f"{name:<16}{0:<12}{0:<6}{0:<6}{100644:<8}{len(content):<10}`\n".encode()
+        data += content + (b"\n" if len(content) % 2 else b"")
+    return data
+
+
+@pytest.fixture(scope="module")
+def library():
+    # uncompressed random data, so the bytes on the wire are the bytes extracted
+    return os.urandom(LIBRARY_SIZE)
+
+
+@pytest.fixture(scope="module")
+def deb(library):
+    control = _tar({"control": b"Package: libfoo1\nVersion: 1.0-1\nArchitecture: amd64\nDescription: foo\n"})
+    return _ar([("debian-binary", b"2.0\n"), ("control.tar", control),
+                ("data.tar", _tar({LIBRARY: library, "usr/include/foo.h": b"int foo(void);\n"}))])
+
+
+class _Server:
+    """Serves requests with handler on a free local port while in its context."""
+
+    def __init__(self, handler):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self.requests = []
+
+    def __enter__(self):
+        self._server.requests = self.requests
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # the package, set per server through functools.partial
+    def __init__(self, *args, data=b"", **kwargs):
+        self.data = data
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get("Range")))
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(self.data)))
+        self.end_headers()
+        self.write(self.data)
+
+    def write(self, data):
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _DelayedHandler(_Handler):
+    """Answers every request, including the latency probes, after delay seconds."""
+
+    def __init__(self, *args, delay=0.0, **kwargs):
+        self.delay = delay
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        threading.Event().wait(self.delay)
+        super().do_GET()
+
+
+class _SlowHandler(_Handler):
+    def write(self, data):
+        try:
+            for i in range(0, len(data), 1024):
+                self.wfile.write(data[i:i + 1024])
+                self.wfile.flush()
+                threading.Event().wait(0.01)
+        except ConnectionError:
+            # the client gave up on the download
+            pass
+
+
+class _DroppingHandler(_Handler):
+    """Supports range requests, but drops the connection halfway through the first response."""
+
+    def do_GET(self):
+        requested = self.headers.get("Range")
+        self.server.requests.append((self.path, requested))
+        if requested:
+            start = int(requested[len("bytes="):].rstrip("-"))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(self.data) - 1}/{len(self.data)}")
+            self.send_header("Content-Length", str(len(self.data) - start))
+            self.send_header("ETag", '"1"')
+            self.end_headers()
+            self.wfile.write(self.data[start:])
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(self.data)))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", '"1"')
+        self.end_headers()
+        self.wfile.write(self.data[:len(self.data) // 2])
+        self.wfile.flush()
+        self.connection.shutdown(socket.SHUT_RDWR)
+        self.close_connection = True
+
+
+class _NotFoundHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get("Range")))
+        self.send_error(404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _refused_url():
+    # a port nothing listens on
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}"
+
+
+def _conanfile(tmp_path, mirrors, **conf):
+    build_folder = tmp_path / "build"
+    build_folder.mkdir()
+    return _Conanfile(build_folder, **{
+        "user.debiantools:cache_folder": str(tmp_path / "cache"),
+        "user.debiantools:cache_max_size": 0,
+        "user.debiantools:mirrors": {"test": mirrors},
+        "user.debiantools:probe_mirrors": False,
+        "tools.files.download:retry": 0,
+        **conf})
+
+
+def _extracted(conanfile):
+    return sorted(os.path.relpath(os.path.join(root, name), conanfile.build_folder)
+                  for root, _, files in os.walk(conanfile.build_folder) for name in files
+                  if name != debiantools.MANIFEST_FILE)
+
+
+def test_failover_on_not_found(tmp_path, deb):
+    with _Server(_NotFoundHandler) as missing, _Server(functools.partial(_Handler, data=deb)) as mirror:
+        conanfile = _conanfile(tmp_path, [missing.url, mirror.url])
+        debiantools.download_extract_debs(conanfile, [(f"{missing.url}/libfoo1.deb", hashlib.sha256(deb).hexdigest())])
+        assert missing.requests == [("/libfoo1.deb", None)]
+        assert mirror.requests == [("/libfoo1.deb", None)]
+    assert _extracted(conanfile) == ["usr/include/foo.h", LIBRARY]
+
+
+def test_failover_on_connection_refused(tmp_path, deb):
+    refused = _refused_url()
+    with _Server(functools.partial(_Handler, data=deb)) as mirror:
+        conanfile = _conanfile(tmp_path, [refused, mirror.url])
+        debiantools.download_extract_debs(conanfile, [(f"{refused}/libfoo1.deb", hashlib.sha256(deb).hexdigest())])
+        assert mirror.requests == [("/libfoo1.deb", None)]
+    assert _extracted(conanfile) == ["usr/include/foo.h", LIBRARY]
+    assert any(refused in warning for warning in conanfile.output.warnings)
+
+
+def test_min_speed_moves_to_next_mirror(tmp_path, deb, monkeypatch):
+    monkeypatch.setattr(debiantools, "MIRROR_MIN_SPEED_GRACE", 0.2)
+    with _Server(functools.partial(_SlowHandler, data=deb)) as slow, \
+            _Server(functools.partial(_Handler, data=deb)) as fast:
+        # the slow server sends about 100 KB/s
+        conanfile = _conanfile(tmp_path, [slow.url, fast.url], **{"user.debiantools:mirror_min_speed": 1024})
+        debiantools.download_extract_debs(conanfile, [(f"{slow.url}/libfoo1.deb", hashlib.sha256(deb).hexdigest())])
+        assert slow.requests == [("/libfoo1.deb", None)]
+        assert fast.requests == [("/libfoo1.deb", None)]
+    assert _extracted(conanfile) == ["usr/include/foo.h", LIBRARY]
+    assert any("slower than 1024 KB/s" in warning for warning in conanfile.output.warnings)
+
+
+def test_resume_after_dropped_connection(tmp_path, deb, library):
+    with _Server(functools.partial(_DroppingHandler, data=deb)) as mirror:
+        conanfile = _conanfile(tmp_path, [mirror.url])
+        debiantools.download_extract_debs(conanfile, [(f"{mirror.url}/libfoo1.deb", hashlib.sha256(deb).hexdigest())])
+        assert len(mirror.requests) == 2
+        path, requested = mirror.requests[1]
+        assert path == "/libfoo1.deb"
+        # urllib3 2 drops the partial chunk read when the connection broke, the resume can start before it
+        assert requested.startswith("bytes=") and requested.endswith("-")
+        assert 0 < int(requested[len("bytes="):-1]) <= len(deb) // 2
+    with open(os.path.join(conanfile.build_folder, LIBRARY), "rb") as f:
+        assert f.read() == library
+
+
+def test_checksum_mismatch_leaves_build_folder_clean(tmp_path, deb):
+    with _Server(functools.partial(_Handler, data=deb)) as mirror:
+        conanfile = _conanfile(tmp_path, [mirror.url])
+        with pytest.raises(ConanException, match="sha256 signature failed"):
+            debiantools.download_extract_debs(conanfile, [(f"{mirror.url}/libfoo1.deb", "0" * 64)])
+    assert os.listdir(conanfile.build_folder) == []
+
+
+def test_fastest_mirror_first_and_ranking_reused(tmp_path, deb, monkeypatch):
+    with _Server(functools.partial(_DelayedHandler, data=deb, delay=0.5)) as slow, \
+            _Server(functools.partial(_DelayedHandler, data=deb)) as fast:
+        debs = [(f"{slow.url}/libfoo1.deb", hashlib.sha256(deb).hexdigest())]
+        conanfile = _conanfile(tmp_path, [slow.url, fast.url], **{"user.debiantools:probe_mirrors": True})
+        debiantools.download_extract_debs(conanfile, debs)
+        # probed once each, the package comes from the fast mirror although the url and the list name the slow one
+        assert slow.requests == [("/", None)]
+        assert fast.requests == [("/", None), ("/libfoo1.deb", None)]
+        assert _extracted(conanfile) == ["usr/include/foo.h", LIBRARY]
+
+        # a new process only has the ranking saved in the cache folder
+        monkeypatch.setattr(debiantools, "_mirror_rankings", {})
+        (tmp_path / "build").rename(tmp_path / "build1")
+        conanfile = _conanfile(tmp_path, [slow.url, fast.url], **{"user.debiantools:probe_mirrors": True})
+        debiantools.download_extract_debs(conanfile, debs)
+        assert slow.requests == [("/", None)]
+        assert fast.requests == [("/", None), ("/libfoo1.deb", None), ("/libfoo1.deb", None)]
+    assert os.path.isfile(tmp_path / "cache" / debiantools.MIRRORS_FILE)
@@ -4,6 +4,12 @@ from conan.tools.files import apply_conandata_patches, export_conandata_patches,
 from conan.tools.scm import Version
 import os
 
+try:
+    # exports copies it next to the recipe, so it is missing while exporting
+    from buildcache import apply_compiler_cache, compiler_cache
+except ImportError:
+    pass
+
 required_conan_version = ">=1.53.0"
 
 
@@ -27,6 +33,7 @@ class ZlibConan(ConanFile):
         "shared": False,
         "fPIC": True,
     }
+    exports = ["../buildcache.py"]
 
     @property
     def _is_mingw(self):
@@ -61,6 +68,7 @@ class ZlibConan(ConanFile):
         # Correct for misuse of "${CMAKE_INSTALL_PREFIX}/" in CMakeLists.txt
         tc.variables["INSTALL_LIB_DIR"] = "lib"
         tc.variables["INSTALL_INC_DIR"] = "include"
+        apply_compiler_cache(self, tc)
         tc.generate()
 
     def _patch_sources(self):
@@ -82,8 +90,9 @@ class ZlibConan(ConanFile):
     def build(self):
         self._patch_sources()
         cmake = CMake(self)
-        cmake.configure()
-        cmake.build()
+        with compiler_cache(self):
+            cmake.configure()
+            cmake.build()
 
     def _extract_license(self):
         tmp = load(self, os.path.join(self.source_folder, "zlib.h"))